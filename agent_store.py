@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, List, Tuple
+
+from timestamps import TimestampCache
+
+# Format timestamps
+timestamp_fields = {
+    'enteredStateOn': 'formatted_enteredStateOn',
+    'lastLoginTime': 'formatted_lastLoginTime',
+    'lastLogoffTime': 'formatted_lastLogoffTime',
+}
+
+
+class AgentRecord:
+    """One agent's displayable fields, stored as a flat list in the store's field order."""
+
+    __slots__ = ('index', 'values', '_row', '_row_fields')
+
+    def __init__(self, index: Dict[str, int], values: List):
+        self.index = index
+        self.values = values
+        self._row = None
+        self._row_fields = None
+
+    def __getitem__(self, field: str):
+        return self.values[self.index[field]]
+
+    def get(self, field: str, default=None):
+        i = self.index.get(field)
+        return default if i is None else self.values[i]
+
+    def row(self, fields: Tuple[str, ...]) -> Dict:
+        # Records are replaced, never changed, on update, so the projected row can be reused until the columns change
+        if self._row_fields is not fields:
+            self._row = {field: self.get(field) for field in fields}
+            self._row_fields = fields
+        return self._row
+
+
+class AgentStore:
+    """Latest record per agent id, holding only `fields`, with the derived display fields filled in once per update."""
+
+    def __init__(self, fields: Iterable[str], timestamp_cache_size: int = 4096):
+        self.fields = tuple(dict.fromkeys(['id', *fields]))
+        self.index = {field: i for i, field in enumerate(self.fields)}
+        self.agents: Dict = {}
+        self.timestamps = TimestampCache(maxsize=timestamp_cache_size)
+
+    def format_agent(self, agent: Dict) -> None:
+        # Epoch milliseconds; the browser ticks it into HH:MM:SS (see the table's body slot in app.py)
+        agent['time_in_status'] = self.timestamps.epoch_ms(agent.get('enteredStateOn'))
+        for raw_field, display_field in timestamp_fields.items():
+            agent[display_field] = self.timestamps.display(agent.get(raw_field))
+
+    def record(self, agent: Dict) -> AgentRecord:
+        self.format_agent(agent)
+        return AgentRecord(self.index, [agent.get(field) for field in self.fields])
+
+    def snapshot(self) -> Dict:
+        return {'fields': list(self.fields), 'agents': [record.values for record in self.agents.values()]}
+
+    def restore(self, snapshot: Dict) -> int:
+        # Values are stored in field order; remap only if the columns have changed since the snapshot was taken
+        saved_fields = snapshot['fields']
+        if tuple(saved_fields) == self.fields:
+            rows = snapshot['agents']
+        else:
+            positions = [saved_fields.index(f) if f in saved_fields else None for f in self.fields]
+            rows = [[values[p] if p is not None else None for p in positions] for values in snapshot['agents']]
+        for values in rows:
+            record = AgentRecord(self.index, values)
+            self.agents[record['id']] = record
+        return len(rows)
+
+    def apply(self, batch: List[Dict]) -> List[AgentRecord]:
+        records = []
+        for agent in batch:
+            record = self.record(agent)
+            self.agents[record['id']] = record
+            records.append(record)
+        return records
@@ -1,26 +1,117 @@
 import asyncio
+import copy
 import json
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from nicegui import ui, app
-from typing import Dict
-from datetime import datetime, timezone
+from typing import Dict, Optional
 from functools import partial
 import subprocess
 import sys
 import os
 import re
+import time
+from datetime import datetime
+from row_diff import RowDiff
+from table_view import SortedView
+from name_index import NameIndex
+from history import StateHistory
+from summary import TeamSummary, format_duration
+from ingest import FrameDecoder, FrameRecorder, IngestQueue, is_agent_frame
+from agent_store import AgentStore
+from signalr_client import SessionExpired, SignalRClient, is_hub_call
+from browser_stats import BrowserUsage
+from metrics import Metrics, SIZE_BUCKETS, watch_loop_lag
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from stream import AgentStream, StreamSubscriber
 
-live_agent_stats = {}
-name_filter_values = []
-selected_names = []
-name_filter_card = None
-name_filter_visible = False
-name_filter_query = ''
 credentials = None
-login_failed = False
-switches = {}
 subprocesses = []
 ws_active = False
+# 0 sends every row and sorts in the browser; above 0 the server sorts, filters and sends one page of this size
+PAGE_SIZE = int(os.environ.get('IGNITE_PAGE_SIZE', '0'))
+# One Dashboard per open page, each with its own filter, columns and sort over the shared agent store
+dashboards = set()
+# Text shared by every page through bindings, so the worker and timers never touch a page's elements
+status = dict.fromkeys(['phase', 'login', 'loading', 'batch', 'connection', 'stale', 'startup', 'browser', 'debug'], '')
+agent_names = []
+shared_row_fields = {}
+# How long incoming frames are collected before being applied and rendered in one go
+BATCH_WINDOW_MS = int(os.environ.get('IGNITE_BATCH_WINDOW_MS', '100'))
+# Updates waiting beyond this many are folded into the agent's already-waiting update instead of queueing
+INGEST_QUEUE_SIZE = int(os.environ.get('IGNITE_QUEUE_SIZE', '10000'))
+# Frames at least this big (initial snapshots) are decoded in a worker process, off the event loop
+LARGE_FRAME_BYTES = int(os.environ.get('IGNITE_LARGE_FRAME_BYTES', str(64 * 1024)))
+# Once logged in and set up, read the realtime stream directly instead of keeping the headless browser open
+DIRECT_CLIENT = os.environ.get('IGNITE_DIRECT_CLIENT', '') == '1'
+signalr_connect_url = os.environ.get('IGNITE_SIGNALR_URL')
+# Hub invocations the Ignite page sent on its websocket, keyed by hub/method/args, replayed by the direct client
+signalr_hub_calls = {}
+hub_call_seen = asyncio.Event()
+# Warn if the direct stream has carried no agent update for this long; the page may subscribe in ways not replayed
+DIRECT_SILENCE_WARNING = 120
+# Messages the page may hold while Python is busy before the oldest are dropped
+SSE_BUFFER_SIZE = 1000
+sse_stats = {'received': 0, 'batches': 0, 'dropped': 0}
+# Raw frames are appended here for bench.py to replay, e.g. IGNITE_CAPTURE=capture.jsonl
+CAPTURE_PATH = os.environ.get('IGNITE_CAPTURE')
+frame_recorder = FrameRecorder(CAPTURE_PATH) if CAPTURE_PATH else None
+agent_history = StateHistory('agent_history.sqlite3')
+# Restored on launch so the table has (stale) data before the headless browser is even started
+SNAPSHOT_PATH = 'agent_snapshot.json'
+warm_started = False
+stale_ids = set()  # restored agents with no live update yet; their rows are dimmed
+stale_since = ''
+BROWSER_PROFILE_DIR = 'browser_profile'
+# How long the Ignite dashboard gets to render, and the page to subscribe to its hub, before carrying on
+DASHBOARD_TIMEOUT = 15
+# No live data this long after launch means the saved settings flag is out of date
+FIRST_FRAME_TIMEOUT = 30
+credentials_entered = asyncio.Event()
+first_frame = asyncio.Event()
+startup_timings = {}
+phase_clock = None
+startup_clock = None
+# Cut the headless browser down to what capturing frames needs once the dashboard is set up
+CAPTURE_ONLY = os.environ.get('IGNITE_CAPTURE_ONLY', '') == '1'
+CAPTURE_ONLY_ARGS = [
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    '--mute-audio',
+    '--no-first-run',
+    '--renderer-process-limit=1',
+    '--blink-settings=imagesEnabled=false',
+]
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'stylesheet', 'media'}
+BLOCKED_HOSTS = ('google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'hotjar.com', 'nr-data.net')
+blocked_requests = 0
+browser_usage = BrowserUsage()
+metrics = Metrics()
+# Local NDJSON feed of live_agent_stats for wallboards and scripts, so they need no browser session of their own
+agent_stream = AgentStream()
+frames_received = metrics.counter('ignite_frames_received_total', 'Raw frames received, by source')
+frames_skipped = metrics.counter('ignite_frames_skipped_total', 'Frames dropped by the pre-filter without parsing')
+frames_accepted = metrics.counter('ignite_frames_accepted_total', 'Frames passed by the pre-filter for decoding')
+frames_decoded = metrics.counter('ignite_frames_decoded_total', 'Frames carrying at least one agent update')
+frames_discarded = metrics.counter('ignite_frames_discarded_total', 'Accepted frames that held no agent updates')
+parse_errors = metrics.counter('ignite_parse_errors_total', 'Frames that could not be decoded')
+agent_updates = metrics.counter('ignite_agent_updates_total', 'Agent updates decoded from frames')
+sse_dropped = metrics.counter('ignite_sse_dropped_total', 'Messages the in-page SSE buffer overwrote before delivery')
+decode_seconds = metrics.histogram('ignite_decode_seconds', 'Time to decode one frame')
+flush_seconds = metrics.histogram('ignite_flush_seconds', 'Time to apply one batch, table render included')
+update_table_seconds = metrics.histogram('ignite_update_table_seconds', 'Time spent in update_table')
+rows_sent = metrics.histogram('ignite_rows_sent', 'Rows pushed to the browser per render', SIZE_BUCKETS)
+queue_depth = metrics.histogram('ignite_queue_depth', 'Updates waiting in the ingest queue when drained', SIZE_BUCKETS)
+queue_superseded = metrics.counter('ignite_queue_superseded_total', 'Updates folded into a waiting one while full')
+ingest_queue = IngestQueue(BATCH_WINDOW_MS, INGEST_QUEUE_SIZE, superseded=queue_superseded)
+loop_lag = metrics.histogram('ignite_event_loop_lag_seconds', 'How late the event loop wakes a 250 ms sleeper')
+last_parse_error = ''
+DEBUG_OVERLAY = os.environ.get('IGNITE_DEBUG_OVERLAY', '') == '1'
 
 async def save_session(context):
     cookies = await context.cookies()
@@ -32,36 +123,52 @@ async def load_session(context):
         cookies = json.load(f)
     await context.add_cookies(cookies)
 
-def login_status_check():
-    global login_failed
-    if login_failed:
-        login_status_label.text = 'Login failed. Please try again.'
-        loading_container.classes(add='hidden')
-        loading_label.text = ''
-        login_container.classes(remove='hidden')
-    else:
-        login_status_label.text = ''
-
 def terminate_processes():
     for process in subprocesses:
         process.terminate()
 
     app.shutdown()
 
-def login_attempt():
-    global credentials, login_failed
-    login_failed = False
-    loading_label.text = 'Attempting login...'
-    login_container.classes(add='hidden')
-    loading_container.classes(remove='hidden')
-    credentials = {"username": input_u.value, "password": input_p.value}
+def login_attempt(username, password):
+    global credentials
+    status['login'] = ''
+    status['loading'] = 'Attempting login...'
+    status['phase'] = 'loading'
+    credentials = {"username": username, "password": password}
+    credentials_entered.set()
+
+def start_phases():
+    global phase_clock, startup_clock
+    phase_clock = startup_clock = time.perf_counter()
+
+def end_phase(name):
+    global phase_clock
+    now = time.perf_counter()
+    startup_timings[name] = now - phase_clock
+    phase_clock = now
+    render_startup_timings()
+
+def render_startup_timings():
+    status['startup'] = 'Startup: ' + ' · '.join(
+        f'{name} {seconds:.1f}s' for name, seconds in startup_timings.items())
+
+def load_dashboard_state():
+    try:
+        with open('dashboard_state.json', 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_dashboard_state(state):
+    with open('dashboard_state.json', 'w') as f:
+        json.dump(state, f)
 
-def save_column_config():
+def save_column_config(config):
     with open('column_config.json', 'w') as f:
-        json.dump(columns_config, f)
+        json.dump(config, f)
 
 def load_column_config():
-    global columns_config
+    # The last saved layout becomes the starting layout of each new viewer
     try:
         with open('column_config.json', 'r') as f:
             loaded = json.load(f)
@@ -70,296 +177,516 @@ def load_column_config():
                 for col in loaded:
                     col.setdefault('classes', '')
                     col.setdefault('headerClasses', '')
-                columns_config = loaded
+                return loaded
     except FileNotFoundError:
         pass
+    return copy.deepcopy(columns_config)
 
-def save_selected_names():
+def save_selected_names(names):
     with open('selected_names.json', 'w') as f:
-        json.dump(selected_names, f)
+        json.dump(sorted(names), f)
 
 def load_selected_names():
     try:
         with open('selected_names.json', 'r') as f:
-            selected_names.extend(json.load(f))
+            return set(json.load(f))
     except FileNotFoundError:
-        pass
-
-def apply_column_order():
-    table.columns = columns_config
-    table.update()
-
-def move_column(index: int, direction: int):
-    new_index = index + direction
-    if 0 <= new_index < len(columns_config):
-        columns_config[index], columns_config[new_index] = columns_config[new_index], columns_config[index]
-        apply_column_order()
-        save_column_config()
-
-def toggle(column: Dict, visible: bool) -> None:
-    column['classes'] = '' if visible else 'hidden'
-    column['headerClasses'] = '' if visible else 'hidden'
-    apply_column_order()
-    save_column_config()
-
-def toggle_all_columns(value: bool):
-    for column in columns_config:
-        toggle(column, value)
-    for sw in switches.values():
-        if sw.value != value:
-            sw.value = value
-
-def handle_column_toggle(column, event):
-    toggle(column, event.value)
-
-def render_config_ui():
-    config_panel.clear()
-    switches.clear()
-    with config_panel:
-        ui.label('Column Configuration').classes('font-bold mb-2')
-        ui.label('Column configuration will be retained on close of the app.').classes('text-red text-xs')
-        all_visible = all(col.get('classes', '') == '' for col in columns_config)
-        ui.switch("Select All", value=all_visible, on_change=lambda e: toggle_all_columns(e.value))
-
-        for idx, col in enumerate(columns_config):
-            visible = col.get('classes', '') == ''
-            with ui.row().classes('w-full items-center justify-between'):
-                switch = ui.switch(
-                    col['label'],
-                    on_change=partial(handle_column_toggle, col)
-                )
-                switch.value = visible  # <-- this line ensures correct state
-                switches[col['name']] = switch
-
-                with ui.row().classes('gap-1'):
-                    ui.button(on_click=partial(move_column, idx, -1), icon='arrow_upward').classes('h-6 w-6 text-xs')
-                    ui.button(on_click=partial(move_column, idx, 1), icon='arrow_downward').classes('h-6 w-6 text-xs')
-
-def toggle_name_filter():
-    global name_filter_visible
-    name_filter_visible = not name_filter_visible
-    if name_filter_visible:
-        render_name_checkboxes()
-        name_filter_card.classes(remove='hidden')
-    else:
-        name_filter_card.classes('hidden')
-
-def update_filter_query(value: str):
-    global name_filter_query
-    name_filter_query = value
-    render_name_checkboxes()
-
-def render_name_checkboxes():
-    name_checkbox_column.clear()
-    filtered_names = [n for n in name_filter_values if name_filter_query.lower() in n.lower()]
-
-    with name_checkbox_column:
-        for name in filtered_names:
-            def toggle_handler(e, name=name):
-                if e.value and name not in selected_names:
-                    selected_names.append(name)
-                elif not e.value and name in selected_names:
-                    selected_names.remove(name)
-                
-                save_selected_names()
-                update_table()
-
-            ui.checkbox(name, value=name in selected_names, on_change=toggle_handler)
-
-def update_table():
-    now = datetime.now(timezone.utc)
-
-    names_set = set()
-    for agent in live_agent_stats.values():
-        try:
-            start_time = datetime.fromisoformat(agent['enteredStateOn']).astimezone(timezone.utc)
-            delta = now - start_time
-            hours, remainder = divmod(int(delta.total_seconds()), 3600)
-            minutes, seconds = divmod(remainder, 60)
-            agent['time_in_status'] = f"{hours:02}:{minutes:02}:{seconds:02}"
-        except Exception:
-            agent['time_in_status'] = "--:--:--"
-
-        for raw_field, display_field in timestamp_fields.items():
-            raw_value = agent.get(raw_field)
+        return set()
+
+def save_snapshot():
+    if len(stale_ids) == len(live_agent_stats):
+        return  # nothing newer than what is already on disk
+    data = agent_store.snapshot()
+    data['saved_at'] = time.time()
+    with open(SNAPSHOT_PATH + '.tmp', 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(SNAPSHOT_PATH + '.tmp', SNAPSHOT_PATH)
+
+def load_snapshot():
+    global warm_started, stale_since
+    try:
+        with open(SNAPSHOT_PATH, 'r') as f:
+            data = json.load(f)
+        restored = agent_store.restore(data)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return
+    if restored:
+        warm_started = True
+        # Marked per record: a live update replaces the record's values, which clears the mark for that row only
+        stale = agent_store.index['stale']
+        for record in live_agent_stats.values():
+            record.values[stale] = True
+        stale_ids.update(live_agent_stats)
+        stale_since = datetime.fromtimestamp(data.get('saved_at', 0)).strftime('%d/%m/%Y %H:%M:%S')
+        render_stale_note()
+        refresh_name_index()
+
+def render_stale_note():
+    # Ignite only sends agents that change, so restored rows turn live one at a time
+    status['stale'] = (f'{len(stale_ids)} agents still showing saved data from {stale_since} '
+                       'until their next update (dimmed)' if stale_ids else '')
+
+def refresh_name_index():
+    global agent_names
+    agent_names = sorted({agent['name'] for agent in live_agent_stats.values()})
+    for dashboard in dashboards:
+        dashboard.set_names(agent_names)
+
+
+# ui.run listens on every interface, but these read-outs are for tools on this machine only
+LOOPBACK_HOSTS = {'127.0.0.1', '::1', 'localhost'}
+
+def local_only(request: Request):
+    if request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail='Only available from this machine')
+
+@app.get('/api/history/totals', dependencies=[Depends(local_only)])
+async def history_totals(day: Optional[str] = None):
+    return await agent_history.day_totals(day)
+
+@app.get('/api/history/time_in_state', dependencies=[Depends(local_only)])
+async def history_time_in_state(agent_id: str, state: str, start: int, end: int):
+    return {'duration_ms': await agent_history.time_in_state(agent_id, state, start, end)}
+
+@app.get('/metrics', dependencies=[Depends(local_only)])
+def metrics_text():
+    return PlainTextResponse(metrics.prometheus(), media_type='text/plain; version=0.0.4')
+
+@app.get('/api/metrics', dependencies=[Depends(local_only)])
+def metrics_json():
+    return metrics.as_dict()
+
+def split_param(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else None
+
+@app.get('/api/agents/stream', dependencies=[Depends(local_only)])
+async def agents_stream(names: Optional[str] = None, states: Optional[str] = None, fields: Optional[str] = None):
+    """A snapshot line, then one delta line per applied batch; names, states and fields are comma-separated."""
+    wanted = split_param(fields) or agent_store.fields
+    unknown = [field for field in wanted if field not in agent_store.index]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    subscriber = StreamSubscriber(
+        tuple(dict.fromkeys(['id', *wanted])), names=split_param(names), states=split_param(states))
+    return StreamingResponse(agent_stream.lines(subscriber, live_agent_stats), media_type='application/x-ndjson')
+
+def handle_frame(payload, inbound, source='ws'):
+    frames_received.inc(source=source)
+    if frame_recorder:
+        frame_recorder.record(payload, source)
+    if not is_agent_frame(payload):
+        frames_skipped.inc(source=source)
+        return
+    frames_accepted.inc(source=source)
+    frame_decoder.submit(payload, source)
+
+def handle_decoded(agents, source, seconds):
+    decode_seconds.observe(seconds)
+    if not agents:
+        frames_discarded.inc(source=source)
+        return
+
+    frames_decoded.inc(source=source)
+    agent_updates.inc(len(agents))
+    for agent in agents:
+        ingest_queue.put(agent)
+    if not first_frame.is_set():
+        first_frame.set()
+        if startup_clock is not None:
+            startup_timings['first frame after'] = time.perf_counter() - startup_clock
+            render_startup_timings()
+
+def handle_decode_error(error, source):
+    global last_parse_error
+    parse_errors.inc(source=source)
+    last_parse_error = f'{type(error).__name__}: {error}'
+
+frame_decoder = FrameDecoder(handle_decoded, handle_decode_error, LARGE_FRAME_BYTES)
+
+async def consume_updates():
+    # The only reader of ingest_queue, so batches are applied one at a time and in arrival order
+    while True:
+        batch = await ingest_queue.next_batch()
+        queue_depth.observe(len(batch))
+        with flush_seconds.time():
             try:
-                dt = datetime.fromisoformat(raw_value)
-                agent[display_field] = dt.strftime('%d/%m/%Y %H:%M:%S')
-            except Exception:
-                agent[display_field] = '--'
-
-        names_set.add(agent['name'])
+                apply_batch(batch)
+            except Exception as e:
+                app.handle_exception(e)
+
+def apply_batch(batch):
+    # Only rebuild the name filter when a name appears or changes, not on every state change
+    names_changed = any(live_agent_stats.get(agent['id'], {}).get('name') != agent['name'] for agent in batch)
+    records = agent_store.apply(batch)
+    agent_history.record(records)
+    agent_stream.publish(records)
+    if stale_ids:
+        stale_ids.difference_update(record['id'] for record in records)
+        render_stale_note()
+    if names_changed:
+        refresh_name_index()
+    # Latest record per agent, so each dashboard sees every changed agent once
+    changed = list({record['id']: record for record in records}.values())
+    for dashboard in dashboards:
+        dashboard.apply(changed)
+    status['batch'] = (
+        f'{ingest_queue.last_batch_size} updates in last batch ({ingest_queue.window_ms} ms window), '
+        f'{queue_superseded.total():.0f} superseded while the queue was full'
+    )
 
-    # Only update filter options if we have new names
-    global name_filter_values
-    if set(name_filter_values) != names_set:
-        name_filter_values.clear()
-        name_filter_values.extend(sorted(names_set))
-        render_name_checkboxes()
-
-    # Apply filter if active
-    if selected_names:
-        filtered_agents = [a for a in live_agent_stats.values() if a['name'] in selected_names]
-        table.rows = filtered_agents
-    else:
-        table.rows = list(live_agent_stats.values())
+async def handle_websocket(ws):
+    global ws_active, signalr_connect_url
+    ws_active = True
+    if 'connectionData' in ws.url and not signalr_connect_url:
+        signalr_connect_url = ws.url
+    ws.on("framereceived", lambda payload: handle_frame(payload, inbound=True))
+    ws.on("framesent", record_hub_call)
+
+def record_hub_call(payload):
+    if is_hub_call(payload):
+        call = json.loads(payload)
+        signalr_hub_calls[json.dumps([call['H'], call['M'], call.get('A')])] = payload
+        hub_call_seen.set()
+
+async def handle_sse_batch(messages, dropped):
+    if ws_active:
+        # The websocket carries the same updates; applying both would double every frame. True tells the page
+        # to stop forwarding SSE messages at all
+        return True
+    sse_stats['received'] += len(messages)
+    sse_stats['batches'] += 1
+    sse_stats['dropped'] += dropped
+    sse_dropped.inc(dropped)
+    for msg in messages:
+        handle_frame(msg, inbound=True, source='sse')
+    status['connection'] = f"SSE: {sse_stats['received']} messages, {sse_stats['dropped']} dropped"
+    return False
+
+async def run_direct_client():
+    status['connection'] = (f'Streaming directly from Ignite (browser closed, '
+                            f'{len(signalr_hub_calls)} hub calls replayed)')
+    asyncio.create_task(warn_if_direct_silent())
+    try:
+        client = SignalRClient(signalr_connect_url, on_frame=partial(handle_frame, inbound=True, source='direct'),
+                               hub_calls=signalr_hub_calls.values())
+        await client.run()
+    except SessionExpired:
+        status['connection'] = 'Ignite session expired. Restart the app to log in again.'
+    except Exception as e:
+        # Started after the browser was closed, so nothing else would notice the stream has stopped
+        status['connection'] = f'Direct stream stopped: {type(e).__name__}: {e}. Restart the app to reconnect.'
+        app.handle_exception(e)
+
+async def warn_if_direct_silent():
+    await asyncio.sleep(DIRECT_SILENCE_WARNING)
+    if not frames_decoded.values.get((('source', 'direct'),)):
+        status['connection'] = (f'Direct stream connected but no agent updates in {DIRECT_SILENCE_WARNING} s; '
+                                'if agents are changing, restart without IGNITE_DIRECT_CLIENT')
+
+def open_app_window():
+    return subprocess.Popen([
+        sys.executable,
+        'webview_launcher.py',
+        '--url', 'http://localhost:8080',
+        '--title', 'Ignite',
+        '--width', '900',
+        '--height', '600',
+        '--resizable'
+    ])
 
-    table.update()
+async def run_app_window(login_window, app_window=None):
+    if login_window:
+        login_window.terminate()
+        subprocesses.remove(login_window)
 
+    status['phase'] = 'main'
 
-async def handle_frame(payload, inbound):
-    try:
-        data = json.loads(payload)
-        if isinstance(data, dict) and "M" in data:
-            for msg in data["M"]:
-                if msg.get("M") == "onAgentStateChanged":
-                    agent = msg["A"][0]
-                    agent["name"] = f"{agent['firstName']} {agent['lastName']}"
-                    live_agent_stats[agent["id"]] = agent
-                    update_table()
-    except Exception:
-        pass
+    if app_window is None:
+        app_window = open_app_window()
 
-async def handle_websocket(ws):
-    global ws_active
-    ws_active = True
-    ws.on("framereceived", lambda payload: asyncio.create_task(handle_frame(payload, inbound=True)))
+    while True:
+        return_code = app_window.poll()
+        if return_code is not None:
+            app.shutdown()
+        await asyncio.sleep(1)
 
 async def playwright_worker():
-    global credentials, login_failed
-
-    async def poll_sse_messages(page):
-        while True:
-            if ws_active:
-                break  # Stop polling if WebSocket is active
-            messages = await page.evaluate("() => window._sse_messages.splice(0)")
-            for msg in messages:
-                await handle_frame(msg, inbound=True)
-            await asyncio.sleep(0.1)
-
-    login_window = subprocess.Popen([
-            sys.executable,
-            'webview_launcher.py',
-            '--url', 'http://localhost:8080',
-            '--title', 'Login',
-            '--width', '400',
-            '--height', '400',
-            '--frameless'
-    ])
-    loading_label.text = 'Starting invisible browser...'
-    loading_container.classes(remove='hidden')
-    subprocesses.append(login_window)
+    global credentials
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, executable_path=r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe")        
-        
-        if os.path.exists('storage.json'):
-            context = await browser.new_context(storage_state='storage.json')
-        else:
-            context = await browser.new_context()
+    if warm_started:
+        # The saved agents are already in the table, so open the app window straight away
+        login_window = None
+        app_window = open_app_window()
+        status['phase'] = 'main'
+    else:
+        app_window = None
+        login_window = subprocess.Popen([
+                sys.executable,
+                'webview_launcher.py',
+                '--url', 'http://localhost:8080',
+                '--title', 'Login',
+                '--width', '400',
+                '--height', '400',
+                '--frameless'
+        ])
+        status['loading'] = 'Starting invisible browser...'
+        status['phase'] = 'loading'
+        subprocesses.append(login_window)
 
-        page = await context.new_page()
+    start_phases()
+    async with async_playwright() as p:
+        # A persistent profile keeps cookies and the Ignite SPA's HTTP cache between launches
+        new_profile = not os.path.exists(BROWSER_PROFILE_DIR)
+        context = await p.chromium.launch_persistent_context(
+            BROWSER_PROFILE_DIR,
+            headless=True,
+            executable_path=r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+            args=CAPTURE_ONLY_ARGS if CAPTURE_ONLY else [],
+        )
+        if new_profile and os.path.exists('storage.json'):
+            with open('storage.json', 'r') as f:
+                await context.add_cookies(json.load(f).get('cookies', []))
+
+        page = context.pages[0] if context.pages else await context.new_page()
+        await page.expose_function('igniteSseBridge', handle_sse_batch)
         await page.add_init_script("""
             (() => {
                 const originalEventSource = window.EventSource;
-                window._sse_messages = [];
+                const MAX_BUFFERED = %d;
+                let buffer = [];
+                let dropped = 0;
+                let flushing = false;
+                let stopped = false;  // set once Python says the websocket has taken over
+
+                // One bridge call in flight at a time; anything arriving meanwhile goes out as the next batch
+                function flush() {
+                    if (flushing || !buffer.length) return;
+                    const batch = buffer;
+                    const droppedNow = dropped;
+                    buffer = [];
+                    dropped = 0;
+                    flushing = true;
+                    window.igniteSseBridge(batch, droppedNow).then(stop => {
+                        if (stop) {
+                            stopped = true;
+                            buffer = [];
+                        }
+                    }).finally(() => {
+                        flushing = false;
+                        flush();
+                    });
+                }
 
                 window.EventSource = function (url, config) {
                     const sse = new originalEventSource(url, config);
                     sse.addEventListener('message', function (event) {
-                        window._sse_messages.push(event.data);
+                        if (stopped) return;
+                        if (buffer.length >= MAX_BUFFERED) {
+                            buffer.shift();
+                            dropped++;
+                        }
+                        buffer.push(event.data);
+                        setTimeout(flush, 0);
                     });
                     return sse;
                 };
             })();
-        """)
-        
+        """ % SSE_BUFFER_SIZE)
+
         page.on("websocket", lambda ws: asyncio.create_task(handle_websocket(ws)))
+        end_phase('browser')
 
         await page.goto("https://ccm01.lrg.co.uk/ignite", wait_until='domcontentloaded')
 
-        while True:
-            await asyncio.sleep(1)
-            if credentials and await page.query_selector('#username'):
-                loading_container.classes(add='hidden')
-                login_container.classes(remove='hidden')
-                try:
-                    await page.fill('#username', credentials['username'])
-                    await page.fill('input[type="password"]', credentials['password'])
-                    await page.keyboard.press("Enter")
-                    await page.wait_for_url(re.compile(r".*realtime.*"), timeout=5000)
-                    await context.storage_state(path="storage.json")
-                    loading_label.text = 'Login successful'
-                    break
-                except Exception:
-                    login_failed = True
-                    credentials = None
-            elif not await page.query_selector('#username'):
-                break
-        
-        asyncio.create_task(poll_sse_messages(page))
-
+        # Either the login form shows up or the app routes to the realtime pages
         try:
-            await page.click('button[a-id="Cancel"]', timeout=2000)
-        except Exception:
+            await page.wait_for_function(
+                "() => document.querySelector('#username') || location.href.includes('realtime')", timeout=15000)
+        except PlaywrightTimeoutError:
             pass
 
-        await page.goto("https://ccm01.lrg.co.uk/ignite/#!/realtime/dashboard/")
-
-        loading_label.text = 'Setting up Ignite...'
+        while await page.query_selector('#username'):
+            if not credentials:
+                # No valid session; ask for credentials (in the app window after a warm start)
+                status['phase'] = 'login'
+                credentials_entered.clear()
+                await credentials_entered.wait()
+            try:
+                await page.fill('#username', credentials['username'])
+                await page.fill('input[type="password"]', credentials['password'])
+                await page.keyboard.press("Enter")
+                await page.wait_for_url(re.compile(r".*realtime.*"), timeout=5000)
+                await context.storage_state(path="storage.json")
+                status['loading'] = 'Login successful'
+                break
+            except Exception:
+                status['login'] = 'Login failed. Please try again.'
+                credentials = None
+        end_phase('login')
 
-        await page.locator('a[a-id="EditDashboard"]').nth(0).click()
-        
-        try:
-            await page.locator('a[a-id="Settings"]').nth(0).click(timeout=1000)
-        except Exception:
-            await page.locator('a[a-id="EditDashboard"]').nth(0).click()
-            await page.locator('a[a-id="Settings"]').nth(0).click(timeout=1000)
+        cancel = page.locator('button[a-id="Cancel"]')
+        if await cancel.count():
+            await cancel.first.click()
 
-        checkbox = await page.query_selector('input[a-id="VoiceSelectAllCheckbox"]')
-        class_attr = await checkbox.get_attribute('class')
+        await page.goto("https://ccm01.lrg.co.uk/ignite/#!/realtime/dashboard/")
+        end_phase('navigation')
 
-        if 'ng-not-empty' in class_attr.split():
+        # The dashboard widget has rendered once its edit link is there; live data follows on its own
+        status['loading'] = 'Waiting for the Ignite dashboard...'
+        try:
+            await page.locator('a[a-id="EditDashboard"]').first.wait_for(
+                state='visible', timeout=DASHBOARD_TIMEOUT * 1000)
+        except PlaywrightTimeoutError:
             pass
-        else:
-            while True:
-                try:
-                    await page.locator('div[ng-click="showMore()"]').nth(0).click(timeout=1000)
-                    await asyncio.sleep(1)
-                except Exception:
-                    break
+        end_phase('dashboard')
 
-            await page.click('input[type="checkbox"][a-id="VoiceSelectAllCheckbox"]')
+        settings_applied = load_dashboard_state().get('select_all_applied', False)
+        if not settings_applied:
+            status['loading'] = 'Setting up Ignite...'
+            await apply_dashboard_settings(page)
+            save_dashboard_state({'select_all_applied': True})
+        else:
+            asyncio.create_task(reapply_settings_if_silent(context, page))
+        end_phase('settings' if not settings_applied else 'settings (skipped)')
 
-            await page.click('input[type="submit"][value="Apply"]')
+        status['loading'] = 'Launching app...'
 
-        loading_label.text = 'Launching app...'
-        await asyncio.sleep(2)
+        if CAPTURE_ONLY:
+            await strip_page(context, page)
 
-        login_window.terminate()
-        subprocesses.remove(login_window)
+        if DIRECT_CLIENT and signalr_connect_url:
+            # Playwright was only needed to log in and apply the dashboard settings, but the direct client
+            # replays the page's hub calls, so keep the page until it has subscribed
+            try:
+                await asyncio.wait_for(hub_call_seen.wait(), timeout=DASHBOARD_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            await context.storage_state(path='storage.json')
+            await context.close()
+            asyncio.create_task(run_direct_client())
+
+        await run_app_window(login_window, app_window)
+
+async def reapply_settings_if_silent(context, page):
+    # The saved flag only skips opening the settings up front; Ignite can reset them on its side, so if no data
+    # turns up, check the real Select All checkbox (apply_dashboard_settings stops there if it is ticked)
+    try:
+        await asyncio.wait_for(first_frame.wait(), timeout=FIRST_FRAME_TIMEOUT)
+        return
+    except asyncio.TimeoutError:
+        pass
+    if page.is_closed():
+        # The direct client closed the browser, so only the next launch can go through the settings
+        save_dashboard_state({'select_all_applied': False})
+        status['connection'] = (f'No Ignite data in {FIRST_FRAME_TIMEOUT} s; '
+                                'the dashboard settings will be applied again on the next launch')
+        return
+    status['connection'] = f'No Ignite data in {FIRST_FRAME_TIMEOUT} s; checking the dashboard settings...'
+    try:
+        if CAPTURE_ONLY:
+            await unstrip_page(context, page)
+        await apply_dashboard_settings(page)
+        if CAPTURE_ONLY:
+            await strip_page(context, page)
+    except Exception as e:
+        save_dashboard_state({'select_all_applied': False})
+        status['connection'] = f'Could not check the dashboard settings ({type(e).__name__}); restart the app to retry'
+        app.handle_exception(e)
+        return
+    status['connection'] = 'Dashboard settings checked; waiting for Ignite data'
+
+async def block_non_essential(route):
+    global blocked_requests
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+        blocked_requests += 1
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def strip_page(context, page):
+    # Only safe once the dashboard is configured: the settings clicks rely on the page being styled and laid out
+    await context.route('**/*', block_non_essential)
+    await page.set_viewport_size({'width': 320, 'height': 240})
+    style = await page.add_style_tag(content='''
+        *, *::before, *::after { animation: none !important; transition: none !important; }
+        body { display: none !important; }
+    ''')
+    await style.evaluate("element => element.id = 'ignite-strip'")
+
+async def unstrip_page(context, page):
+    # Undoes strip_page so the settings can be clicked through again
+    await context.unroute('**/*', block_non_essential)
+    await page.set_viewport_size({'width': 1280, 'height': 720})
+    await page.evaluate("document.getElementById('ignite-strip')?.remove()")
+
+def render_debug_overlay():
+    received = frames_received.as_dict()
+    lines = [
+        'frames  ' + '  '.join(f'{source} {count:.0f}' for source, count in received.items()),
+        f'skipped {frames_skipped.total():.0f}  accepted {frames_accepted.total():.0f}  '
+        f'off-loop {frame_decoder.offloaded}',
+        f'decoded {frames_decoded.total():.0f}  discarded {frames_discarded.total():.0f}  '
+        f'errors {parse_errors.total():.0f}',
+        f'queue   depth {len(ingest_queue)}  max {ingest_queue.max_depth}  superseded {queue_superseded.total():.0f}',
+    ]
+    for label, histogram, scale, unit in (
+        ('decode', decode_seconds, 1000, 'ms'),
+        ('flush', flush_seconds, 1000, 'ms'),
+        ('update_table', update_table_seconds, 1000, 'ms'),
+        ('rows/render', rows_sent, 1, ''),
+        ('loop lag', loop_lag, 1000, 'ms'),
+    ):
+        stats = histogram.as_dict()
+        lines.append(f"{label:<13}p50 {stats['p50'] * scale:.1f}{unit}  p95 {stats['p95'] * scale:.1f}{unit}  "
+                     f"max {stats['max'] * scale:.1f}{unit}")
+    if last_parse_error:
+        lines.append(f'last error: {last_parse_error[:80]}')
+    status['debug'] = '\n'.join(lines)
+
+def report_browser_usage():
+    usage = browser_usage.sample()
+    if usage is None:
+        status['browser'] = ''
+        return
+    status['browser'] = (
+        f"Browser: {usage['rss_mb']:.0f} MB, {usage['cpu_percent']:.0f}% CPU "
+        f"({usage['processes']} processes, {blocked_requests} requests blocked)"
+    )
+
+async def apply_dashboard_settings(page):
+    edit_dashboard = page.locator('a[a-id="EditDashboard"]').nth(0)
+    settings = page.locator('a[a-id="Settings"]').nth(0)
+    await edit_dashboard.click()
+    try:
+        await settings.wait_for(state='visible', timeout=5000)
+    except PlaywrightTimeoutError:
+        # The first click can land before the dashboard has wired up its menu
+        await edit_dashboard.click()
+    await settings.click()
+
+    checkbox = page.locator('input[a-id="VoiceSelectAllCheckbox"]')
+    await checkbox.wait_for(state='attached')
+    class_attr = await checkbox.get_attribute('class')
+
+    if 'ng-not-empty' in class_attr.split():
+        return
+
+    # Each showMore() adds another set of queue checkboxes; carry on until it disappears or stops adding any
+    show_more = page.locator('div[ng-click="showMore()"]').nth(0)
+    while await show_more.is_visible():
+        before = await page.locator('input[type="checkbox"]').count()
+        await show_more.click()
+        try:
+            await page.wait_for_function(
+                "(before) => document.querySelectorAll('input[type=\"checkbox\"]').length > before",
+                arg=before, timeout=5000)
+        except PlaywrightTimeoutError:
+            break
 
-        loading_container.classes(add='hidden')
-        login_container.classes(add='hidden')
-        main_container.classes(remove='hidden')
-
-        app_window = subprocess.Popen([
-            sys.executable,
-            'webview_launcher.py',
-            '--url', 'http://localhost:8080',
-            '--title', 'Ignite',
-            '--width', '900',
-            '--height', '600',
-            '--resizable'
-        ])
+    await page.click('input[type="checkbox"][a-id="VoiceSelectAllCheckbox"]')
 
-        while True:
-            return_code = app_window.poll()
-            if return_code is not None:
-                save_column_config()
-                save_selected_names()
-                app.shutdown()
-            await asyncio.sleep(1)
+    await page.click('input[type="submit"][value="Apply"]')
 
 # ---------- UI ----------- #
 
@@ -402,68 +729,402 @@ for col in columns_config:
     col.setdefault('classes', '')
     col.setdefault('headerClasses', '')
 
-with ui.column().classes('w-full h-screen items-center justify-center p-8 hidden') as login_container:
-    login_label = ui.label('Ignite Login').classes('text-2xl')
-    input_u = ui.input('Username').classes('w-full text-lg')
-    input_p = ui.input('Password', password=True).classes('w-full text-lg')
-    login_status_label = ui.label().classes('w-full')
-    with ui.row().classes('w-full justify-center') as button_group:
-        ui.button('Log In', on_click=login_attempt).classes('m-4')
-        ui.button('Quit', on_click=terminate_processes).classes('m-4')
-
-with ui.column().classes('w-full h-screen items-center justify-center p-8 hidden') as loading_container:
-    loading = ui.spinner(size='xl')
-    loading_label = ui.label()
-
-with ui.column().classes('w-full h-screen p-4 hidden') as main_container:
-    with ui.row().classes('w-full justify-between items-stretch'):
-        with ui.column().classes('max-w-3xl'):
-            ui.label('Ignite').classes('text-2xl font-bold')
-            ui.label('All data is directly streamed from the Ignite portal via invisible browser.') \
-                .classes('text-xs break-words')
-        
-        with ui.row().classes('flex-grow justify-end items-end'):
-            ui.button('Filter Names', on_click=lambda: toggle_name_filter())
-            with ui.button(text="Configure Columns", on_click=render_config_ui):
-                with ui.menu(), ui.column().classes('gap-0 p-2'):
-                    config_panel = ui.column().classes('gap-0')
-                    render_config_ui()
-
-
-    table = ui.table(
-        columns=columns_config,
-        column_defaults={'sortable': True},
-        rows=[],
-        row_key='id',
-    ).classes('w-full').style('max-height: 88vh; overflow-y: auto;').classes('sticky-header')
-
-    with ui.card().classes(
-        'fixed top-1/2 left-1/2 transform -translate-x-1/2 -translate-y-1/2 '
-        'z-50 shadow-xl bg-white p-6 w-96 border border-gray-300 gap-0 hidden'
-    ) as card:
-        name_filter_card = card
-        ui.label('Filter by Agent Name').classes('font-bold text-lg mb-2 text-center')
-        ui.label('Filters will be retained on close of the app.').classes('text-red text-xs')
-        ui.input('Search names...', on_change=lambda e: update_filter_query(e.value)).classes('w-full')
-        name_checkbox_column = ui.column().classes('w-full h-64 overflow-y-scroll')  # for dynamic checkboxes
-        with ui.row().classes('w-full justify-between'):
-            ui.button('Clear Filter', on_click=lambda: (selected_names.clear(), update_table())).classes('mt-2')
-            ui.button('Close', on_click=toggle_name_filter).props('flat').classes('mt-2 text-sm')
-
-# Format timestamps
-timestamp_fields = {
-    'enteredStateOn': 'formatted_enteredStateOn',
-    'lastLoginTime': 'formatted_lastLoginTime',
-    'lastLogoffTime': 'formatted_lastLogoffTime',
-}
+# Only the fields some column shows are kept per agent; the rest of the Ignite payload is dropped on arrival
+# 'stale' is only ever set on records restored from the snapshot; live agents never carry it
+agent_store = AgentStore(fields=[*(col['field'] for col in columns_config), 'stale'], timestamp_cache_size=4096)
+live_agent_stats = agent_store.agents
+
+
+class Dashboard:
+    """One viewer's page: its own name filter, column layout, sort, summary and table.
+
+    The agent store and ingestion are shared; each batch hands every dashboard only the agents that changed,
+    so a viewer's render cost follows the changes it can see rather than the size of the store.
+    """
+
+    def __init__(self):
+        self.columns_config = load_column_config()
+        self.selected_names = load_selected_names()
+        self.name_index = NameIndex()
+        self.name_index.set_names(agent_names)
+        self.name_filter_visible = False
+        self.name_filter_query = ''
+        self.switches = {}
+        self.table_diff = RowDiff(key='id')
+        self.row_positions = {}  # agent id -> index in the table's server-side rows (unpaged only)
+        self.table_view = SortedView(sort_field='name')
+        self.team_summary = TeamSummary(
+            col['field'] for col in columns_config if col['field'].endswith(('DurationToday', 'ConversationsToday'))
+        )
+        self.rendered_summary_version = None
+        self.row_fields = self.visible_fields()
+        self.build()
+        self.apply_name_filter()
+
+    def build(self):
+        with ui.row().classes('w-full justify-between items-stretch'):
+            with ui.column().classes('max-w-3xl'):
+                ui.label('Ignite').classes('text-2xl font-bold')
+                ui.label('All data is directly streamed from the Ignite portal via invisible browser.') \
+                    .classes('text-xs break-words')
+                ui.label().classes('text-xs text-gray-500').bind_text_from(status, 'batch')
+                ui.label().classes('text-xs text-gray-500').bind_text_from(status, 'connection')
+                ui.label().classes('text-xs text-orange-700').bind_text_from(status, 'stale')
+                ui.label().classes('text-xs text-gray-500').bind_text_from(status, 'startup')
+                ui.label().classes('text-xs text-gray-500').bind_text_from(status, 'browser')
+
+            with ui.row().classes('flex-grow justify-end items-end'):
+                ui.button('Filter Names', on_click=self.toggle_name_filter)
+                with ui.button(text="Configure Columns", on_click=self.render_config_ui):
+                    with ui.menu(), ui.column().classes('gap-0 p-2'):
+                        self.config_panel = ui.column().classes('gap-0')
+                        self.render_config_ui()
+
+        if DEBUG_OVERLAY:
+            with ui.card().classes('fixed bottom-2 right-2 z-40 p-2 bg-gray-900 opacity-80'):
+                ui.label().classes('text-xs font-mono text-green-300 whitespace-pre').bind_text_from(status, 'debug')
+
+        with ui.expansion('Team summary', icon='groups', value=True).classes('w-full'):
+            self.summary_states_label = ui.label().classes('text-sm font-bold')
+            self.summary_reasons_label = ui.label().classes('text-sm')
+            self.summary_totals_label = ui.label().classes('text-xs text-gray-600')
+
+        self.table = ui.table(
+            columns=self.table_columns(),
+            column_defaults={'sortable': True},
+            rows=[],
+            row_key='id',
+            pagination={'rowsPerPage': PAGE_SIZE, 'page': 1, 'sortBy': None, 'descending': False, 'rowsNumber': 0}
+            if PAGE_SIZE else None,
+        ).classes('w-full').style('max-height: 88vh; overflow-y: auto;').classes('sticky-header')
+        if PAGE_SIZE:
+            self.table.on('request', self.handle_table_request, ['pagination'])
+        # Rows restored from the snapshot stay dimmed until their agent's first live update
+        self.table.add_slot('body', '''
+            <q-tr :props="props" :class="props.row.stale ? 'opacity-50' : ''">
+                <q-td v-for="col in props.cols" :key="col.name" :props="props">
+                    <span v-if="col.name === 'time_in_status'" class="ignite-clock"
+                          :data-since="col.value ?? ''">--:--:--</span>
+                    <template v-else>{{ col.value }}</template>
+                </q-td>
+            </q-tr>
+        ''')
+
+        with ui.card().classes(
+            'fixed top-1/2 left-1/2 transform -translate-x-1/2 -translate-y-1/2 '
+            'z-50 shadow-xl bg-white p-6 w-96 border border-gray-300 gap-0 hidden'
+        ) as card:
+            self.name_filter_card = card
+            ui.label('Filter by Agent Name').classes('font-bold text-lg mb-2 text-center')
+            ui.label('Filters will be retained on close of the app.').classes('text-red text-xs')
+            ui.input('Search names...', on_change=lambda e: self.update_filter_query(e.value)) \
+                .props('debounce=200').classes('w-full')
+            self.name_checkbox_list = ui.element('q-virtual-scroll').props('virtual-scroll-item-size=40') \
+                .classes('w-full h-64')
+            self.name_checkbox_list._props['items'] = []
+            self.name_checkbox_list.add_slot('default', '''
+                <q-checkbox
+                    :key="props.item.name"
+                    :label="props.item.name"
+                    :model-value="props.item.selected"
+                    @update:model-value="value => { props.item.selected = value; $parent.$emit('toggle', {name: props.item.name, value}) }"
+                />
+            ''')
+            self.name_checkbox_list.on('toggle', self.handle_name_toggle)
+            with ui.row().classes('w-full justify-between'):
+                ui.button('Clear Filter', on_click=self.clear_name_filter).classes('mt-2')
+                ui.button('Close', on_click=self.toggle_name_filter).props('flat').classes('mt-2 text-sm')
+
+    def table_columns(self):
+        # time_in_status holds the epoch the agent entered the state, so sort it newest first
+        return [
+            {**col, ':sort': '(a, b) => (b ?? 0) - (a ?? 0)'} if col['name'] == 'time_in_status' else col
+            for col in self.columns_config
+        ]
+
+    def visible_fields(self):
+        # Rows only carry the fields of columns that are switched on; viewers with the same layout share one
+        # tuple, so AgentRecord.row's cache serves them all
+        fields = ('id', 'stale', *(col['field'] for col in self.columns_config if col.get('classes', '') != 'hidden'))
+        return shared_row_fields.setdefault(fields, fields)
+
+    def apply_column_order(self):
+        self.table.columns = self.table_columns()
+        self.row_fields = self.visible_fields()
+        self.refresh_table()
+
+    def move_column(self, index: int, direction: int):
+        new_index = index + direction
+        if 0 <= new_index < len(self.columns_config):
+            self.columns_config[index], self.columns_config[new_index] = \
+                self.columns_config[new_index], self.columns_config[index]
+            self.apply_column_order()
+            save_column_config(self.columns_config)
+
+    def toggle(self, column: Dict, visible: bool) -> None:
+        if (column.get('classes', '') == '') == visible:
+            return  # e.g. a switch flipped by toggle_all_columns after the column was already set
+        column['classes'] = '' if visible else 'hidden'
+        column['headerClasses'] = '' if visible else 'hidden'
+        self.apply_column_order()
+        save_column_config(self.columns_config)
+
+    def toggle_all_columns(self, value: bool):
+        for column in self.columns_config:
+            column['classes'] = '' if value else 'hidden'
+            column['headerClasses'] = '' if value else 'hidden'
+        self.apply_column_order()
+        save_column_config(self.columns_config)
+        for sw in self.switches.values():
+            if sw.value != value:
+                sw.value = value
+
+    def handle_column_toggle(self, column, event):
+        self.toggle(column, event.value)
+
+    def render_config_ui(self):
+        self.config_panel.clear()
+        self.switches.clear()
+        with self.config_panel:
+            ui.label('Column Configuration').classes('font-bold mb-2')
+            ui.label('Column configuration will be retained on close of the app.').classes('text-red text-xs')
+            all_visible = all(col.get('classes', '') == '' for col in self.columns_config)
+            ui.switch("Select All", value=all_visible, on_change=lambda e: self.toggle_all_columns(e.value))
+
+            for idx, col in enumerate(self.columns_config):
+                visible = col.get('classes', '') == ''
+                with ui.row().classes('w-full items-center justify-between'):
+                    switch = ui.switch(
+                        col['label'],
+                        on_change=partial(self.handle_column_toggle, col)
+                    )
+                    switch.value = visible  # <-- this line ensures correct state
+                    self.switches[col['name']] = switch
+
+                    with ui.row().classes('gap-1'):
+                        ui.button(on_click=partial(self.move_column, idx, -1), icon='arrow_upward') \
+                            .classes('h-6 w-6 text-xs')
+                        ui.button(on_click=partial(self.move_column, idx, 1), icon='arrow_downward') \
+                            .classes('h-6 w-6 text-xs')
+
+    def toggle_name_filter(self):
+        self.name_filter_visible = not self.name_filter_visible
+        if self.name_filter_visible:
+            self.render_name_checkboxes()
+            self.name_filter_card.classes(remove='hidden')
+        else:
+            self.name_filter_card.classes('hidden')
+
+    def update_filter_query(self, value: str):
+        self.name_filter_query = value
+        self.render_name_checkboxes()
+
+    def set_names(self, names):
+        self.name_index.set_names(names)
+        if self.name_filter_visible:
+            self.render_name_checkboxes()
+
+    def render_name_checkboxes(self):
+        # The checkboxes are drawn by a q-virtual-scroll in the browser, so only visible ones exist in the DOM
+        self.name_checkbox_list._props['items'] = [
+            {'name': name, 'selected': name in self.selected_names}
+            for name in self.name_index.search(self.name_filter_query)
+        ]
+        self.name_checkbox_list.update()
+
+    def handle_name_toggle(self, e):
+        name, value = e.args['name'], e.args['value']
+        if value:
+            self.selected_names.add(name)
+        else:
+            self.selected_names.discard(name)
+        # The browser already flipped its own checkbox; keep the server copy in step without re-sending the list
+        for item in self.name_checkbox_list._props['items']:
+            if item['name'] == name:
+                item['selected'] = value
+                break
+
+        save_selected_names(self.selected_names)
+        self.apply_name_filter()
+
+    def clear_name_filter(self):
+        self.selected_names.clear()
+        save_selected_names(self.selected_names)
+        self.apply_name_filter()
+        if self.name_filter_visible:
+            self.render_name_checkboxes()
+
+    def name_filter_predicate(self):
+        if not self.selected_names:
+            return None
+        selected_names = self.selected_names
+        return lambda agent: agent['name'] in selected_names
+
+    def apply(self, records):
+        """Take in the agents that changed in one batch (one record per agent)."""
+        predicate = self.name_filter_predicate()
+        for record in records:
+            self.team_summary.update(record)
+            if PAGE_SIZE:
+                self.table_view.update(record)
+        if PAGE_SIZE:
+            # The page is at most PAGE_SIZE rows, so diffing it whole stays cheap
+            self.update_table()
+        else:
+            with update_table_seconds.time():
+                upserts, removed = self.table_diff.apply(
+                    [record.row(self.row_fields) for record in records if predicate is None or predicate(record)],
+                    [record['id'] for record in records if predicate is not None and not predicate(record)],
+                )
+                self.push_rows(upserts, removed)
+        self.render_summary()
+
+    def update_table(self, page_changed=False):
+        with update_table_seconds.time():
+            rows = self.visible_rows()
+            upserts, removed = self.table_diff.diff(rows)
+            order = self.table_diff.reorder(rows) if PAGE_SIZE else None
+            pagination = None
+            if PAGE_SIZE and self.table.pagination['rowsNumber'] != len(self.table_view):
+                self.table.pagination['rowsNumber'] = len(self.table_view)
+                pagination = {'rowsNumber': len(self.table_view)}
+            if page_changed:
+                pagination = self.table.pagination
+            self.push_rows(upserts, removed, rows, order, pagination)
+
+    def push_rows(self, upserts, removed, rows=None, order=None, pagination=None):
+        if not upserts and not removed and order is None and pagination is None:
+            return
+
+        # Keep the server copy current for reconnecting browsers, but only push the changed rows
+        if rows is not None:
+            self.table._props['rows'] = rows
+        else:
+            self.patch_rows(upserts, removed)
+        self.table.client.run_javascript(
+            f'applyRowDiff({self.table.id}, {json.dumps(upserts)}, {json.dumps(removed)}, '
+            f'{json.dumps(order)}, {json.dumps(pagination)})'
+        )
+        rows_sent.observe(len(upserts))
+
+    def patch_rows(self, upserts, removed):
+        # Same edits as applyRowDiff makes in the browser, so the server copy keeps the browser's row order
+        rows = self.table._props['rows']
+        if removed:
+            gone = set(removed)
+            rows[:] = [row for row in rows if row['id'] not in gone]
+            self.row_positions = {row['id']: i for i, row in enumerate(rows)}
+        for row in upserts:
+            i = self.row_positions.get(row['id'])
+            if i is None:
+                self.row_positions[row['id']] = len(rows)
+                rows.append(row)
+            else:
+                rows[i] = row
+
+    def visible_rows(self):
+        if PAGE_SIZE:
+            pagination = self.table.pagination
+            start = (pagination['page'] - 1) * pagination['rowsPerPage']
+            count = pagination['rowsPerPage'] or len(self.table_view)
+            return [live_agent_stats[agent_id].row(self.row_fields)
+                    for agent_id in self.table_view.window(start, count)]
+
+        # Apply filter if active
+        predicate = self.name_filter_predicate()
+        if predicate:
+            return [a.row(self.row_fields) for a in live_agent_stats.values() if predicate(a)]
+        return [a.row(self.row_fields) for a in live_agent_stats.values()]
+
+    def render_summary(self):
+        if self.team_summary.version == self.rendered_summary_version:
+            return
+        self.rendered_summary_version = self.team_summary.version
+
+        labels = {col['field']: col['label'] for col in self.columns_config}
+        self.summary_states_label.text = ' · '.join(
+            f'{state}: {count}' for state, count in self.team_summary.states().items()) or 'No agents'
+        self.summary_reasons_label.text = ' · '.join(
+            f'{reason}: {count}' for reason, count in self.team_summary.reasons().items())
+        self.summary_totals_label.text = ' · '.join(
+            f"{labels[field]}: {format_duration(value) if field.endswith('DurationToday') else int(value)}"
+            for field, value in self.team_summary.totals.items()
+        )
+
+    def apply_name_filter(self):
+        # The only full rescans: which agents count towards the summary and the sorted view depends on the filter
+        predicate = self.name_filter_predicate()
+        self.team_summary.rebuild(live_agent_stats, predicate=predicate)
+        self.render_summary()
+        if PAGE_SIZE:
+            self.table_view.rebuild(live_agent_stats, predicate=predicate)
+        self.refresh_table()
+
+    def refresh_table(self):
+        if PAGE_SIZE:
+            pagination = self.table.pagination
+            pagination['rowsNumber'] = len(self.table_view)
+            if (pagination['page'] - 1) * pagination['rowsPerPage'] >= len(self.table_view):
+                pagination['page'] = 1
+        rows = self.visible_rows()
+        self.table_diff.reset(rows)
+        self.table.rows = rows
+        if not PAGE_SIZE:
+            self.row_positions = {row['id']: i for i, row in enumerate(rows)}
+
+    def handle_table_request(self, e):
+        # Server-side pagination: Quasar asks for a page/sort instead of sorting and slicing itself
+        pagination = e.args['pagination']
+        column = next((col for col in self.columns_config if col['name'] == pagination.get('sortBy')), None)
+        sort_field = column['field'] if column else 'name'
+        self.table._props['pagination'] = {**self.table.pagination, **pagination}
+        # window() reads the order backwards for descending, so only a new sort column needs the ids re-sorted;
+        # a page flip or direction change just slices a different page and diffs it
+        self.table_view.descending = bool(pagination.get('descending'))
+        if sort_field != self.table_view.sort_field:
+            self.table_view.rebuild(live_agent_stats, sort_field=sort_field)
+        self.update_table(page_changed=True)
+
+
+@ui.page('/')
+def index():
+    with ui.column().classes('w-full h-screen items-center justify-center p-8') \
+            .bind_visibility_from(status, 'phase', value='login'):
+        ui.label('Ignite Login').classes('text-2xl')
+        input_u = ui.input('Username').classes('w-full text-lg')
+        input_p = ui.input('Password', password=True).classes('w-full text-lg')
+        ui.label().classes('w-full').bind_text_from(status, 'login')
+        with ui.row().classes('w-full justify-center'):
+            ui.button('Log In', on_click=lambda: login_attempt(input_u.value, input_p.value)).classes('m-4')
+            ui.button('Quit', on_click=terminate_processes).classes('m-4')
+
+    with ui.column().classes('w-full h-screen items-center justify-center p-8') \
+            .bind_visibility_from(status, 'phase', value='loading'):
+        ui.spinner(size='xl')
+        ui.label().bind_text_from(status, 'loading')
+
+    with ui.column().classes('w-full h-screen p-4').bind_visibility_from(status, 'phase', value='main'):
+        dashboard = Dashboard()
+    dashboards.add(dashboard)
+    ui.context.client.on_disconnect(lambda: dashboards.discard(dashboard))
 
 if __name__ in {"__main__", "__mp_main__"}:
-    load_selected_names()
-    load_column_config()
-    apply_column_order()
-    ui.timer(interval=1, once=True, callback=lambda: asyncio.create_task(playwright_worker()))
-    ui.timer(interval=1, callback=login_status_check)
-    ui.timer(interval=1, callback=update_table)
+    load_snapshot()
+    app.timer(interval=1, once=True, callback=lambda: asyncio.create_task(playwright_worker()))
+    app.timer(interval=1, once=True, callback=lambda: asyncio.create_task(consume_updates()))
+    app.timer(interval=2, callback=agent_history.flush)
+    app.on_shutdown(agent_history.close)
+    app.on_startup(frame_decoder.start)
+    app.on_shutdown(frame_decoder.close)
+    app.timer(interval=60, callback=save_snapshot)
+    app.timer(interval=5, callback=report_browser_usage)
+    app.timer(interval=1, once=True, callback=lambda: asyncio.create_task(watch_loop_lag(loop_lag)))
+    if DEBUG_OVERLAY:
+        app.timer(interval=1, callback=render_debug_overlay)
+    app.on_shutdown(save_snapshot)
+    if frame_recorder:
+        app.timer(interval=5, callback=frame_recorder.flush)
+        app.on_shutdown(frame_recorder.close)
     ui.add_head_html("""
     <style>
         .q-table__middle thead tr {
@@ -477,6 +1138,46 @@ if __name__ in {"__main__", "__mp_main__"}:
             margin: 0 !important;
         }
     </style>
-    """)
+    <script>
+        function applyRowDiff(id, upserts, removed, order = null, pagination = null) {
+            const element = mounted_app.elements[id];
+            if (!element) return;
+            const key = element.props['row-key'];
+            if (removed.length) {
+                const gone = new Set(removed);
+                element.props.rows = element.props.rows.filter(row => !gone.has(row[key]));
+            }
+            const rows = element.props.rows;
+            const index = new Map(rows.map((row, i) => [row[key], i]));
+            for (const row of upserts) {
+                const i = index.get(row[key]);
+                if (i === undefined) rows.push(row);
+                else rows[i] = row;
+            }
+            if (order) {
+                const byKey = new Map(element.props.rows.map(row => [row[key], row]));
+                element.props.rows = order.map(k => byKey.get(k));
+            }
+            if (pagination !== null) {
+                element.props.pagination = {...element.props.pagination, ...pagination};
+            }
+        }
+
+        function tickClocks() {
+            const now = Date.now();
+            for (const clock of document.querySelectorAll('.ignite-clock')) {
+                const since = parseInt(clock.dataset.since);
+                if (isNaN(since)) {
+                    clock.textContent = '--:--:--';
+                    continue;
+                }
+                const total = Math.max(0, Math.floor((now - since) / 1000));
+                const pad = n => String(n).padStart(2, '0');
+                clock.textContent = `${pad(Math.floor(total / 3600))}:${pad(Math.floor(total / 60) % 60)}:${pad(total % 60)}`;
+            }
+        }
+        setInterval(tickClocks, 500);
+    </script>
+    """, shared=True)
     ui.run(show=False, reload=False)
     
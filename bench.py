@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from agent_store import AgentStore
+from history import StateHistory
+from ingest import FrameDecoder, IngestQueue, is_agent_frame, read_capture
+from name_index import NameIndex
+from row_diff import RowDiff
+from stream import AgentStream
+from summary import TeamSummary
+
+STATES = ['Available', 'ACD', 'Non-ACD', 'Make Busy', 'Do Not Disturb', 'Work Timer', 'Logged Off']
+REASONS = ['', 'Lunch', 'Break', 'Training', 'Meeting', 'Admin']
+COUNTERS = [
+    'acdConversationsToday', 'nonAcdConversationsToday', 'outboundConversationsToday',
+    'externalOutboundConversationsToday', 'externalInboundConversationsToday',
+]
+DURATIONS = [
+    'occupiedDurationToday', 'acdDurationToday', 'doNotDisturbDurationToday', 'holdAcdDurationToday',
+    'holdNonAcdDurationToday', 'holdOutboundDurationToday', 'makeBusyDurationToday', 'nonAcdDurationToday',
+    'outboundDurationToday', 'workTimerDurationToday', 'averageAnsweredDurationToday', 'loggedInDurationToday',
+    'loggedInNotPresentDurationToday', 'externalAnswerDurationToday', 'averageTime', 'totalAcdDuration',
+    'totalNonAcdDuration',
+]
+
+# The fields app.columns_config shows
+FIELDS = [
+    'name', 'reporting', 'currentState', 'formatted_enteredStateOn', 'time_in_status', 'reason',
+    'formatted_lastLoginTime', 'formatted_lastLogoffTime', 'unavailablePercentToday', 'availableState',
+    *COUNTERS, *DURATIONS,
+]
+
+
+def synthetic_agent(index: int, now: datetime) -> dict:
+    agent = {
+        'id': f'agent-{index}',
+        'firstName': f'Agent{index}',
+        'lastName': f'Test{index % 97}',
+        'reporting': str(4000 + index),
+        'currentState': random.choice(STATES),
+        'reason': random.choice(REASONS),
+        'enteredStateOn': (now - timedelta(seconds=random.randint(0, 3600))).isoformat(),
+        'lastLoginTime': (now - timedelta(hours=random.randint(1, 8))).isoformat(),
+        'lastLogoffTime': (now - timedelta(hours=random.randint(9, 20))).isoformat(),
+        'unavailablePercentToday': random.randint(0, 100),
+        'availableState': random.choice(['Available', 'Unavailable']),
+    }
+    agent.update({field: random.randint(0, 80) for field in COUNTERS})
+    agent.update({field: f'{random.randint(0, 8):02}:{random.randint(0, 59):02}:00' for field in DURATIONS})
+    return agent
+
+
+def synthetic_frames(agents: int, rate: float, duration: float):
+    """Yields (offset seconds, payload) of onAgentStateChanged frames for `agents` agents at `rate` frames/s."""
+    now = datetime.now(timezone.utc)
+    for n in range(int(rate * duration)):
+        agent = synthetic_agent(random.randrange(agents), now + timedelta(seconds=n / rate))
+        payload = {'C': f'd-{n}', 'M': [{'H': 'RealtimeHub', 'M': 'onAgentStateChanged', 'A': [agent]}]}
+        yield n / rate, json.dumps(payload)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(frames, window_ms: int, speed: float, queue_size: int = 10000,
+              large_frame_bytes: int = 64 * 1024) -> dict:
+    frames = list(frames)  # generate/read up front so it is not counted as pipeline time
+    store = AgentStore(fields=[*FIELDS, 'stale'])
+    row_fields = ('id', 'stale', *FIELDS)
+    history = StateHistory(':memory:')
+    agent_stream = AgentStream()
+    queue = IngestQueue(window_ms, maxsize=queue_size)
+    table_diff = RowDiff(key='id')
+    name_index = NameIndex()
+    team_summary = TeamSummary(field for field in FIELDS if field.endswith(('DurationToday', 'ConversationsToday')))
+    stats = {'frames': 0, 'skipped': 0, 'parse_errors': 0, 'applied': 0, 'renders': 0, 'rows_sent': 0, 'render_seconds': 0.0}
+    pending_arrivals = []
+    latencies = []
+    feeding_done = False
+
+    def flush(batch):
+        started = time.perf_counter()
+        # Same work as app.apply_batch and one unfiltered, unpaged Dashboard.apply, minus the websocket
+        names_changed = any(store.agents.get(agent['id'], {}).get('name') != agent['name'] for agent in batch)
+        records = store.apply(batch)
+        history.record(records)
+        agent_stream.publish(records)
+        stats['applied'] += len(batch)
+        if names_changed:
+            name_index.set_names(sorted({agent['name'] for agent in store.agents.values()}))
+        changed = list({record['id']: record for record in records}.values())
+        for record in changed:
+            team_summary.update(record)
+        upserts, removed = table_diff.apply([record.row(row_fields) for record in changed], [])
+        if upserts or removed:
+            json.dumps(upserts)
+            stats['renders'] += 1
+            stats['rows_sent'] += len(upserts)
+        finished = time.perf_counter()
+        stats['render_seconds'] += finished - started
+        latencies.extend(finished - arrived for arrived in pending_arrivals)
+        pending_arrivals.clear()
+
+    def on_decoded(agents, source, seconds):
+        for agent in agents:
+            queue.put(agent)
+
+    def on_error(error, source):
+        stats['parse_errors'] += 1
+
+    decoder = FrameDecoder(on_decoded, on_error, large_frame_bytes)
+    decoder.start().result()  # worker start-up is not pipeline time either
+
+    async def feed():
+        nonlocal feeding_done
+        start = time.perf_counter()
+        for offset, payload in frames:
+            # Always yield, so a replay that has fallen behind still lets the flush loop run
+            await asyncio.sleep(max(0, start + offset / speed - time.perf_counter()))
+            stats['frames'] += 1
+            pending_arrivals.append(time.perf_counter())
+            if is_agent_frame(payload):
+                decoder.submit(payload, 'bench')
+            else:
+                stats['skipped'] += 1
+        while decoder.draining:
+            await asyncio.sleep(0)
+        feeding_done = True
+        queue.ready.set()  # wake the consumer even if nothing is left to apply
+
+    async def flush_loop():
+        while not feeding_done or len(queue):
+            batch = await queue.next_batch()
+            if batch:
+                flush(batch)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(feed(), flush_loop())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    decoder.close()
+    history.close()
+
+    return {
+        'frames': stats['frames'],
+        'agents': len(store.agents),
+        'skipped': stats['skipped'],
+        'offloaded': decoder.offloaded,
+        'parse_errors': stats['parse_errors'],
+        'superseded': int(queue.superseded.total()),
+        'max_queue_depth': queue.max_depth,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_fps': round(stats['frames'] / elapsed, 1) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'latency_p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'latency_max_ms': round(max(latencies, default=0) * 1000, 2),
+        'renders': stats['renders'],
+        'rows_sent': stats['rows_sent'],
+        'render_ms_total': round(stats['render_seconds'] * 1000, 1),
+        'peak_memory_mb': round(peak / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay Ignite frames through the ingest-to-render pipeline.')
+    parser.add_argument('--capture', type=str, help='JSONL capture written with IGNITE_CAPTURE (default: synthetic)')
+    parser.add_argument('--agents', type=int, default=300, help='Synthetic: number of agents')
+    parser.add_argument('--rate', type=float, default=200, help='Synthetic: frames per second')
+    parser.add_argument('--duration', type=float, default=10, help='Synthetic: seconds of traffic to generate')
+    parser.add_argument('--speed', type=float, default=1, help='Replay speed-up factor')
+    parser.add_argument('--window-ms', type=int, default=100, help='Batch window, as IGNITE_BATCH_WINDOW_MS')
+    parser.add_argument('--queue-size', type=int, default=10000, help='Ingest queue bound, as IGNITE_QUEUE_SIZE')
+    parser.add_argument('--large-frame-bytes', type=int, default=64 * 1024,
+                        help='Frames this big are decoded off the loop, as IGNITE_LARGE_FRAME_BYTES')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic: random seed')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    if args.capture:
+        frames = read_capture(args.capture)
+    else:
+        random.seed(args.seed)
+        frames = synthetic_frames(args.agents, args.rate, args.duration)
+
+    report = asyncio.run(run(frames, args.window_ms, args.speed, args.queue_size, args.large_frame_bytes))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in report.items():
+            print(f'{key:>16}: {value}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:  # optional; the usage readout is simply left out without it
+    psutil = None
+
+# The headless Edge/Chromium processes, not the msedgewebview2 processes behind the app windows
+BROWSER_PROCESS_NAMES = {'msedge', 'msedge.exe', 'chrome', 'chrome.exe', 'chromium', 'headless_shell'}
+
+
+class BrowserUsage:
+    """Memory and CPU of the headless browser processes started by this app."""
+
+    def __init__(self):
+        self.processes: Dict = {}
+
+    def sample(self) -> Optional[Dict]:
+        if psutil is None:
+            return None
+        seen = {}
+        for process in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                if process.name().lower() in BROWSER_PROCESS_NAMES:
+                    # Keep the same Process objects so cpu_percent measures since the previous sample
+                    seen[process.pid] = self.processes.get(process.pid, process)
+            except psutil.Error:
+                continue
+        self.processes = seen
+
+        rss = cpu = 0.0
+        for process in seen.values():
+            try:
+                rss += process.memory_info().rss
+                cpu += process.cpu_percent(interval=None)
+            except psutil.Error:
+                continue
+        return {'processes': len(seen), 'rss_mb': rss / 2**20, 'cpu_percent': cpu}
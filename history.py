@@ -0,0 +1,189 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    agent_id TEXT NOT NULL,
+    name TEXT,
+    state TEXT,
+    reason TEXT,
+    entered_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_agent ON transitions (agent_id, entered_at);
+CREATE INDEX IF NOT EXISTS idx_transitions_time ON transitions (entered_at);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    transitions INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    PRIMARY KEY (day, agent_id, state, reason)
+);
+"""
+
+
+def day_of(epoch_ms: int) -> str:
+    return datetime.fromtimestamp(epoch_ms / 1000).strftime('%Y-%m-%d')
+
+
+def split_at_midnight(start_ms: int, end_ms: int) -> Iterator[Tuple[str, int]]:
+    """Yields (day, milliseconds) for each local day the interval [start_ms, end_ms) touches."""
+    while start_ms < end_ms:
+        start = datetime.fromtimestamp(start_ms / 1000)
+        midnight = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+        part_end = min(end_ms, int(midnight.timestamp() * 1000))
+        yield start.strftime('%Y-%m-%d'), part_end - start_ms
+        start_ms = part_end
+
+
+class StateHistory:
+    """Append-only log of agent state transitions in SQLite, with per-day totals kept up to date as they happen.
+
+    A transition is recorded whenever an agent's (state, reason, entered time) changes. The time spent in the
+    state it leaves is added to the totals straight away, split at midnight across the days it covers, so daily
+    figures never need the log rescanned. Only today's totals are kept in memory; other days are read back.
+    All database work runs on one worker thread, in batches, away from the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        self.connection: Optional[sqlite3.Connection] = None
+        self.current: Dict = {}  # agent id -> (state, reason, entered_at) of the open transition
+        self.agent_totals: Dict = {}  # (day, agent id, state, reason) -> [transitions, duration_ms]
+        self.state_totals: Dict = {}  # (day, state) -> [transitions, duration_ms]
+        self.pending_transitions: List = []
+        self.pending_totals: Dict = {}  # same keys as agent_totals, increments not yet written
+        self.today = datetime.now().strftime('%Y-%m-%d')
+        self.executor.submit(self._open).result()
+
+    def _open(self) -> None:
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        for agent_id, state, reason, entered_at in self.connection.execute(
+            'SELECT agent_id, state, reason, MAX(entered_at) FROM transitions GROUP BY agent_id'
+        ):
+            self.current[agent_id] = (state, reason, entered_at)
+        for day, agent_id, state, reason, transitions, duration_ms in self.connection.execute(
+            'SELECT * FROM daily_totals WHERE day = ?', (self.today,)
+        ):
+            self.agent_totals[(day, agent_id, state, reason)] = [transitions, duration_ms]
+            totals = self.state_totals.setdefault((day, state), [0, 0])
+            totals[0] += transitions
+            totals[1] += duration_ms
+
+    def record(self, agents: Iterable) -> None:
+        today = datetime.now().strftime('%Y-%m-%d')
+        if today != self.today:
+            # Earlier days are already in pending_totals or the database; day_totals reads them from there
+            self.today = today
+            self.agent_totals = {key: t for key, t in self.agent_totals.items() if key[0] >= today}
+            self.state_totals = {key: t for key, t in self.state_totals.items() if key[0] >= today}
+        for agent in agents:
+            entered_at = agent.get('time_in_status')
+            if entered_at is None:
+                continue
+            agent_id = str(agent['id'])
+            state, reason = agent.get('currentState') or '', agent.get('reason') or ''
+            previous = self.current.get(agent_id)
+            if previous == (state, reason, entered_at):
+                continue
+
+            if previous is not None and entered_at > previous[2]:
+                self._add_duration(agent_id, previous, entered_at)
+            self.current[agent_id] = (state, reason, entered_at)
+            self.pending_transitions.append((agent_id, agent.get('name'), state, reason, entered_at))
+
+    def _add_duration(self, agent_id: str, transition, left_at: int) -> None:
+        # The transition counts on the day it was entered; its time goes to each day it ran into
+        state, reason, entered_at = transition
+        entered_day = day_of(entered_at)
+        for day, duration_ms in split_at_midnight(entered_at, left_at):
+            count = 1 if day == entered_day else 0
+            tables = [(self.pending_totals, (day, agent_id, state, reason))]
+            if day >= self.today:
+                tables += [(self.agent_totals, (day, agent_id, state, reason)), (self.state_totals, (day, state))]
+            for totals, key in tables:
+                entry = totals.setdefault(key, [0, 0])
+                entry[0] += count
+                entry[1] += duration_ms
+
+    def _take_pending(self):
+        transitions, totals = self.pending_transitions, self.pending_totals
+        self.pending_transitions, self.pending_totals = [], {}
+        return transitions, totals
+
+    def _write(self, transitions: List, totals: Dict) -> None:
+        with self.connection:
+            self.connection.executemany('INSERT INTO transitions VALUES (?, ?, ?, ?, ?)', transitions)
+            self.connection.executemany(
+                'INSERT INTO daily_totals VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (day, agent_id, state, reason) DO UPDATE SET '
+                'transitions = transitions + excluded.transitions, duration_ms = duration_ms + excluded.duration_ms',
+                [(*key, count, duration) for key, (count, duration) in totals.items()],
+            )
+
+    async def flush(self) -> None:
+        if not self.pending_transitions and not self.pending_totals:
+            return
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._write, *self._take_pending())
+
+    def close(self) -> None:
+        self.executor.submit(self._write, *self._take_pending()).result()
+        self.executor.submit(self.connection.close).result()
+        self.executor.shutdown()
+
+    def _stored_totals(self, day: str) -> Dict:
+        rows = self.connection.execute(
+            'SELECT day, agent_id, state, reason, transitions, duration_ms FROM daily_totals WHERE day = ?', (day,))
+        return {(d, agent_id, state, reason): [count, duration] for d, agent_id, state, reason, count, duration in rows}
+
+    async def day_totals(self, day: Optional[str] = None) -> Dict:
+        """Per-state and per-agent time for one day (default today), closed transitions only."""
+        today = datetime.now().strftime('%Y-%m-%d')
+        day = day or today
+        if day == today:
+            agent_totals = {key: t for key, t in self.agent_totals.items() if key[0] == day}
+            state_totals = {state: t for (d, state), t in self.state_totals.items() if d == day}
+        else:
+            await self.flush()
+            agent_totals = await asyncio.get_running_loop().run_in_executor(self.executor, self._stored_totals, day)
+            state_totals = {}
+            for (_, _, state, _), (count, duration) in agent_totals.items():
+                totals = state_totals.setdefault(state, [0, 0])
+                totals[0] += count
+                totals[1] += duration
+
+        return {
+            'states': {state: {'transitions': count, 'duration_ms': duration}
+                       for state, (count, duration) in state_totals.items()},
+            'agents': [{'agent_id': agent_id, 'state': state, 'reason': reason,
+                        'transitions': count, 'duration_ms': duration}
+                       for (_, agent_id, state, reason), (count, duration) in agent_totals.items()],
+        }
+
+    def _time_in_state(self, agent_id: str, state: str, start_ms: int, end_ms: int, now_ms: int) -> int:
+        # The transition open at start_ms, plus every one entered before end_ms, via the (agent_id, entered_at) index
+        rows = self.connection.execute(
+            'SELECT state, entered_at FROM transitions WHERE agent_id = ? AND entered_at < ? AND entered_at >= '
+            'COALESCE((SELECT MAX(entered_at) FROM transitions WHERE agent_id = ? AND entered_at <= ?), 0) '
+            'ORDER BY entered_at',
+            (agent_id, end_ms, agent_id, start_ms),
+        ).fetchall()
+        total = 0
+        for i, (row_state, entered_at) in enumerate(rows):
+            left_at = rows[i + 1][1] if i + 1 < len(rows) else min(end_ms, now_ms)
+            if row_state == state:
+                total += max(0, min(left_at, end_ms) - max(entered_at, start_ms))
+        return total
+
+    async def time_in_state(self, agent_id: str, state: str, start_ms: int, end_ms: int) -> int:
+        """Milliseconds `agent_id` spent in `state` between start_ms and end_ms, including the open transition."""
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._time_in_state, str(agent_id), state, start_ms, end_ms, int(time.time() * 1000))
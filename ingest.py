@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from metrics import Counter
+
+AGENT_STATE_METHOD = "onAgentStateChanged"
+
+
+def is_agent_frame(payload) -> bool:
+    # Keep-alives, acks and other hub methods never mention the method name, so they skip json.loads entirely
+    if isinstance(payload, bytes):
+        return AGENT_STATE_METHOD.encode() in payload
+    return AGENT_STATE_METHOD in payload
+
+
+def decode_agent_updates(payload) -> List[Dict]:
+    data = json.loads(payload)
+    agents = []
+    if isinstance(data, dict) and "M" in data:
+        for msg in data["M"]:
+            if msg.get("M") == AGENT_STATE_METHOD:
+                agent = msg["A"][0]
+                agent["name"] = f"{agent['firstName']} {agent['lastName']}"
+                agents.append(agent)
+    return agents
+
+
+def timed_decode(payload) -> Tuple[List[Dict], float]:
+    start = time.perf_counter()
+    agents = decode_agent_updates(payload)
+    return agents, time.perf_counter() - start
+
+
+class FrameDecoder:
+    """Decodes frames in arrival order, handing frames of `large_frame_bytes` or more to a worker process.
+
+    json.loads holds the GIL for the whole parse, so a thread would still stall the event loop; a process does
+    not. While a large frame is being decoded, later frames wait behind it, so updates still reach
+    `on_decoded` in the order they arrived. Small frames with nothing ahead of them are decoded straight away.
+    """
+
+    def __init__(self, on_decoded: Callable, on_error: Callable, large_frame_bytes: int = 64 * 1024):
+        self.on_decoded = on_decoded  # (agents, source, seconds)
+        self.on_error = on_error  # (exception, source)
+        self.large_frame_bytes = large_frame_bytes
+        self.executor = ProcessPoolExecutor(max_workers=1)
+        self.backlog: Deque[Tuple] = deque()
+        self.draining = False
+        self.offloaded = 0
+
+    def start(self) -> Future:
+        # Spawning the worker re-imports the main module, so do it up front rather than on the first snapshot
+        return self.executor.submit(timed_decode, '{}')
+
+    def submit(self, payload, source: str) -> None:
+        if self.draining or len(payload) >= self.large_frame_bytes:
+            self.backlog.append((payload, source))
+            if not self.draining:
+                self.draining = True
+                asyncio.get_running_loop().create_task(self._drain())
+            return
+        self._decode_inline(payload, source)
+
+    def _decode_inline(self, payload, source: str) -> None:
+        try:
+            agents, seconds = timed_decode(payload)
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+            self.on_error(error, source)
+            return
+        self._deliver(agents, source, seconds)
+
+    def _deliver(self, agents: List[Dict], source: str, seconds: float) -> None:
+        # A failing consumer is reported like a bad frame; raising out of _drain would strand the backlog
+        try:
+            self.on_decoded(agents, source, seconds)
+        except Exception as error:
+            self.on_error(error, source)
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self.backlog:
+                payload, source = self.backlog.popleft()
+                if len(payload) < self.large_frame_bytes:
+                    self._decode_inline(payload, source)
+                    continue
+                self.offloaded += 1
+                try:
+                    agents, seconds = await loop.run_in_executor(self.executor, timed_decode, payload)
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+                    self.on_error(error, source)
+                    continue
+                except BrokenProcessPool as error:
+                    # The worker died (e.g. out of memory on a huge frame); report it and start a fresh one
+                    self.on_error(error, source)
+                    self.executor = ProcessPoolExecutor(max_workers=1)
+                    continue
+                self._deliver(agents, source, seconds)
+        finally:
+            self.draining = False
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class IngestQueue:
+    """Agent updates waiting to be applied, in arrival order, drained by a single consumer.
+
+    Bounded at `maxsize`: once full, an update for an agent that already has one waiting replaces it in place
+    rather than queueing behind it. An agent with nothing waiting is still queued, so the depth can exceed
+    maxsize by at most one entry per agent and no agent's latest state is dropped.
+    """
+
+    def __init__(self, window_ms: int, maxsize: int = 10000, superseded: Optional[Counter] = None):
+        self.window_ms = window_ms
+        self.maxsize = maxsize
+        self.entries: Deque[List] = deque()  # [agent id, agent] in arrival order
+        self.waiting: Dict = {}  # agent id -> its newest entry in `entries`
+        self.ready = asyncio.Event()
+        self.received = 0
+        self.superseded = superseded or Counter('queue_superseded_total', 'Updates folded into a waiting one')
+        self.max_depth = 0
+        self.batches = 0
+        self.last_batch_size = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, agent: Dict) -> None:
+        self.received += 1
+        agent_id = agent["id"]
+        entry = self.waiting.get(agent_id)
+        if entry is not None and len(self.entries) >= self.maxsize:
+            entry[1] = agent
+            self.superseded.inc()
+            return
+        entry = [agent_id, agent]
+        self.entries.append(entry)
+        self.waiting[agent_id] = entry
+        self.max_depth = max(self.max_depth, len(self.entries))
+        self.ready.set()
+
+    def drain(self) -> List[Dict]:
+        batch = [agent for _, agent in self.entries]
+        self.entries = deque()
+        self.waiting = {}
+        self.ready.clear()
+        self.last_batch_size = len(batch)
+        if batch:
+            self.batches += 1
+        return batch
+
+    async def next_batch(self) -> List[Dict]:
+        await self.ready.wait()
+        # Let the rest of the window's updates arrive so they are rendered together
+        await asyncio.sleep(self.window_ms / 1000)
+        return self.drain()
+
+
+class FrameRecorder:
+    """Appends raw frames to a JSONL capture, one {"t", "source", "payload"} object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.frames = 0
+
+    def record(self, payload, source: str) -> None:
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8', errors='replace')
+        self.file.write(json.dumps({'t': time.time(), 'source': source, 'payload': payload}) + '\n')
+        self.frames += 1
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, str]]:
+    """Yields (seconds since the first frame, payload) from a FrameRecorder capture."""
+    start = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            if start is None:
+                start = frame['t']
+            yield frame['t'] - start, frame['payload']
@@ -0,0 +1,138 @@
+import asyncio
+import bisect
+import time
+from typing import Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def label_text(labels: Tuple) -> str:
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def prometheus(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{label_text(labels)}}} {value}' if labels else f'{self.name} {value}')
+        return lines
+
+    def as_dict(self) -> Dict:
+        by_label = {','.join(str(value) for _, value in labels): count for labels, count in self.values.items() if labels}
+        return {'total': self.total(), **by_label}
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus layout, plus the last and largest observation."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+        self.max = max(self.max, value)
+
+    def time(self) -> 'Timer':
+        return Timer(self)
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation; the largest one seen for the +Inf bucket
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def prometheus(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {self.sum}')
+        lines.append(f'{self.name}_count {self.count}')
+        return lines
+
+    def as_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'last': self.last,
+            'max': self.max,
+        }
+
+
+class Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metrics:
+    """The counters and histograms of the ingest and render path, readable as Prometheus text or JSON."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.metrics: Dict = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def as_dict(self) -> Dict:
+        return {
+            'uptime_seconds': time.time() - self.started,
+            **{name: metric.as_dict() for name, metric in self.metrics.items()},
+        }
+
+
+async def watch_loop_lag(histogram: Histogram, interval: float = 0.25) -> None:
+    # How late the loop wakes a sleeper is how long something else held it
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - expected))
@@ -0,0 +1,38 @@
+from typing import Iterable, List
+
+
+class NameIndex:
+    """Sorted agent names with their lowercase forms precomputed for the name filter.
+
+    Typing usually extends the previous query, so matches are narrowed from the last result
+    instead of rescanning every name.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.lowered: List[str] = []
+        self.name_set = set()
+        self._last_query = ''
+        self._last_matches: List[int] = []
+
+    def set_names(self, names: Iterable[str]) -> None:
+        self.names = sorted(set(names))
+        self.lowered = [name.lower() for name in self.names]
+        self.name_set = set(self.names)
+        self._last_query = ''
+        self._last_matches = []
+
+    def search(self, query: str) -> List[str]:
+        query = query.lower()
+        if not query:
+            return list(self.names)
+
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.names))
+        matches = [i for i in candidates if query in self.lowered[i]]
+
+        self._last_query = query
+        self._last_matches = matches
+        return [self.names[i] for i in matches]
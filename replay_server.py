@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+
+from ingest import read_capture
+
+CONNECTION_TOKEN = 'replay-token'
+
+
+class ReplayServer:
+    """Local stand-in for Ignite's SignalR endpoint that plays back a FrameRecorder capture.
+
+    Speaks just enough of the classic protocol (negotiate, connect, start) for SignalRClient. `events` records
+    the order the client did things in, and `hub_calls` what it sent, so tests can check both. With
+    `wait_for_calls`, nothing is replayed until the client has sent that many hub calls, like a server that only
+    pushes to subscribed connections.
+    """
+
+    def __init__(self, frames: List[Tuple[float, str]], speed: float = 1, cookie: Optional[Tuple[str, str]] = None,
+                 wait_for_calls: int = 0, init_delay: float = 0):
+        self.frames = frames
+        self.speed = speed
+        self.cookie = cookie
+        self.wait_for_calls = wait_for_calls
+        self.init_delay = init_delay
+        self.events: List[str] = []
+        self.hub_calls: List[str] = []
+        self.sockets: List[web.WebSocketResponse] = []
+        self.started = asyncio.Event()
+        self.runner: Optional[web.AppRunner] = None
+        self.port = None
+
+    def _authorised(self, request: web.Request) -> bool:
+        return self.cookie is None or request.cookies.get(self.cookie[0]) == self.cookie[1]
+
+    async def negotiate(self, request: web.Request) -> web.Response:
+        if not self._authorised(request):
+            raise web.HTTPFound('/login')
+        self.events.append('negotiate')
+        return web.json_response({
+            'ConnectionToken': CONNECTION_TOKEN, 'ConnectionId': 'replay', 'KeepAliveTimeout': 20.0,
+            'TryWebSockets': True, 'ProtocolVersion': '1.5',
+        })
+
+    async def start(self, request: web.Request) -> web.Response:
+        self.events.append('start')
+        self.started.set()
+        return web.json_response({'Response': 'started'})
+
+    async def connect(self, request: web.Request) -> web.WebSocketResponse:
+        if request.query.get('connectionToken') != CONNECTION_TOKEN:
+            raise web.HTTPBadRequest()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        self.events.append('connect')
+        await asyncio.sleep(self.init_delay)
+        await ws.send_str(json.dumps({'C': 's-0,0', 'S': 1, 'M': []}))
+        self.events.append('init')
+
+        subscribed = asyncio.Event()
+
+        async def read_calls():
+            async for msg in ws:
+                self.hub_calls.append(msg.data)
+                if len(self.hub_calls) >= self.wait_for_calls:
+                    subscribed.set()
+
+        reader = asyncio.create_task(read_calls())
+        # Like the real server, push nothing until the client has called /start
+        await self.started.wait()
+        if self.wait_for_calls:
+            waiter = asyncio.create_task(subscribed.wait())
+            await asyncio.wait([reader, waiter], return_when=asyncio.FIRST_COMPLETED)
+            if not subscribed.is_set():
+                waiter.cancel()
+                return ws  # the client went away without subscribing
+        started = asyncio.get_running_loop().time()
+        for offset, payload in self.frames:
+            await asyncio.sleep(max(0, started + offset / self.speed - asyncio.get_running_loop().time()))
+            await ws.send_str(payload)
+        self.events.append('replayed')
+        await reader
+        return ws
+
+    async def start_serving(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get('/signalr/negotiate', self.negotiate)
+        app.router.add_get('/signalr/start', self.start)
+        app.router.add_get('/signalr/connect', self.connect)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        self.port = self.runner.addresses[0][1]
+        return f'ws://{host}:{self.port}/signalr/connect?transport=webSockets&connectionData=%5B%5D'
+
+    async def stop(self) -> None:
+        for ws in self.sockets:
+            await ws.close()
+        await self.runner.cleanup()
+
+
+async def serve(capture: str, port: int, speed: float) -> None:
+    server = ReplayServer(list(read_capture(capture)), speed=speed)
+    url = await server.start_serving(port=port)
+    print(f'Replaying {len(server.frames)} frames; connect with IGNITE_SIGNALR_URL={url}')
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a frame capture as a local SignalR endpoint.')
+    parser.add_argument('capture', help='JSONL capture written with IGNITE_CAPTURE')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1, help='Replay speed-up factor')
+    args = parser.parse_args()
+    asyncio.run(serve(args.capture, args.port, args.speed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class RowDiff:
+    """Remembers what the browser was last sent so only changed rows go over the websocket.
+
+    Rows are kept by reference, so callers must hand in a new dict rather than edit one that was diffed.
+    """
+
+    def __init__(self, key: str = 'id'):
+        self.key = key
+        self.sent: Dict = {}
+        self.order: List = []
+
+    def reset(self, rows: List[Dict]) -> None:
+        self.sent = {row[self.key]: row for row in rows}
+        self.order = [row[self.key] for row in rows]
+
+    def reorder(self, rows: List[Dict]) -> Optional[List]:
+        # Only matters when the server decides the order (paginated tables); None if unchanged
+        order = [row[self.key] for row in rows]
+        if order == self.order:
+            return None
+        self.order = order
+        return order
+
+    def diff(self, rows: List[Dict]) -> Tuple[List[Dict], List]:
+        upserts = []
+        visible = set()
+        for row in rows:
+            row_id = row[self.key]
+            visible.add(row_id)
+            previous = self.sent.get(row_id)
+            if previous is not row and previous != row:
+                upserts.append(row)
+            self.sent[row_id] = row
+
+        removed = [row_id for row_id in self.sent if row_id not in visible]
+        for row_id in removed:
+            del self.sent[row_id]
+
+        return upserts, removed
+
+    def apply(self, rows: List[Dict], gone: List) -> Tuple[List[Dict], List]:
+        """Like diff, but told only what changed: `rows` to upsert and the ids in `gone` that left the view."""
+        upserts = []
+        for row in rows:
+            row_id = row[self.key]
+            previous = self.sent.get(row_id)
+            if previous is not row and previous != row:
+                upserts.append(row)
+            self.sent[row_id] = row
+
+        removed = [row_id for row_id in gone if self.sent.pop(row_id, None) is not None]
+        return upserts, removed
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from typing import Callable, Dict, Iterable
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import aiohttp
+
+CLIENT_PROTOCOL = '1.5'
+INIT_TIMEOUT = 10
+
+
+class SessionExpired(Exception):
+    pass
+
+
+def session_cookies(storage_path: str, host: str) -> Dict[str, str]:
+    with open(storage_path, 'r') as f:
+        state = json.load(f)
+    return {
+        cookie['name']: cookie['value']
+        for cookie in state.get('cookies', [])
+        if host.endswith(cookie.get('domain', '').lstrip('.'))
+    }
+
+
+def is_hub_call(payload) -> bool:
+    # What the page sends to the server: hub invocations look like {"H": hub, "M": method, "A": args, "I": id}
+    try:
+        data = json.loads(payload)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(data, dict) and 'H' in data and 'M' in data
+
+
+class SignalRClient:
+    """Reads the Ignite realtime stream straight from the SignalR endpoint using the saved login session.
+
+    `connect_url` is the SignalR websocket URL the Ignite page itself opened; only its host, path and
+    connectionData (the hub list) are reused, a fresh connection token is negotiated on every connect.
+    `hub_calls` are the invocations the page sent after connecting (subscriptions and the like); they are
+    replayed on every connection so the server pushes the same updates it pushed to the page.
+    """
+
+    def __init__(self, connect_url: str, on_frame: Callable[[str], None],
+                 storage_path: str = 'storage.json', reconnect_delay: float = 5, hub_calls: Iterable[str] = ()):
+        parts = urlsplit(connect_url)
+        secure = parts.scheme in ('https', 'wss')
+        base_path = parts.path.rsplit('/', 1)[0]  # strip the /connect endpoint
+        self.http_base = urlunsplit(('https' if secure else 'http', parts.netloc, base_path, '', ''))
+        self.ws_base = urlunsplit(('wss' if secure else 'ws', parts.netloc, base_path, '', ''))
+        self.host = parts.hostname or ''
+        self.connection_data = parse_qs(parts.query)['connectionData'][0]
+        self.on_frame = on_frame
+        self.hub_calls = list(hub_calls)
+        self.storage_path = storage_path
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self.frames_received = 0
+        self.reconnects = 0
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._run_once()
+            except SessionExpired:
+                self.connected = False
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError):
+                pass
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _get(self, session: aiohttp.ClientSession, endpoint: str, params: Dict) -> Dict:
+        async with session.get(f'{self.http_base}/{endpoint}', params=params, allow_redirects=False) as response:
+            # Ignite answers an expired session with a redirect to the login page
+            if response.status in (301, 302, 401, 403):
+                raise SessionExpired(f'{endpoint} returned {response.status}')
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _run_once(self) -> None:
+        cookies = session_cookies(self.storage_path, self.host)
+        async with aiohttp.ClientSession(cookies=cookies) as session:
+            params = {'clientProtocol': CLIENT_PROTOCOL, 'connectionData': self.connection_data}
+            negotiate = await self._get(session, 'negotiate', params)
+            params = {**params, 'transport': 'webSockets', 'connectionToken': negotiate['ConnectionToken']}
+            # The server sends a keep-alive frame well within KeepAliveTimeout; silence means a dead connection
+            receive_timeout = (negotiate.get('KeepAliveTimeout') or 20) * 2
+
+            async with session.ws_connect(f'{self.ws_base}/connect', params=params,
+                                          receive_timeout=receive_timeout) as ws:
+                await asyncio.wait_for(self._wait_for_init(ws), timeout=INIT_TIMEOUT)
+                await self._get(session, 'start', params)
+                for call in self.hub_calls:
+                    await ws.send_str(call)
+                self.connected = True
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.frames_received += 1
+                        self.on_frame(msg.data)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+
+    async def _wait_for_init(self, ws) -> None:
+        # As in the JS client, /start is only called once the server has confirmed the connection with {"S": 1}
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(msg.data)
+            if isinstance(data, dict) and data.get('S') == 1:
+                return
+            self.frames_received += 1
+            self.on_frame(msg.data)
+        raise aiohttp.ClientError('connection closed before the SignalR init message')
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+
+class StreamSubscriber:
+    """One consumer of the agent stream: its filters, the rows it was last sent, and changes not yet written.
+
+    Changes are coalesced per agent until the consumer reads them, so a slow reader costs at most one
+    pending row per agent rather than an ever-growing backlog.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], names: Optional[Iterable[str]] = None,
+                 states: Optional[Iterable[str]] = None):
+        self.fields = fields
+        self.names = set(names) if names else None
+        self.states = set(states) if states else None
+        self.sent: Dict = {}  # agent id -> row as last written
+        self.upserts: Dict = {}
+        self.removed = set()
+        self.ready = asyncio.Event()
+
+    def matches(self, record) -> bool:
+        return ((self.names is None or record.get('name') in self.names)
+                and (self.states is None or record.get('currentState') in self.states))
+
+    def row(self, record) -> Dict:
+        return {field: record.get(field) for field in self.fields}
+
+    def snapshot(self, records: Iterable) -> Dict:
+        self.sent = {record['id']: self.row(record) for record in records if self.matches(record)}
+        return {'type': 'snapshot', 'agents': list(self.sent.values())}
+
+    def offer(self, record) -> None:
+        agent_id = record['id']
+        if self.matches(record):
+            row = self.row(record)
+            self.removed.discard(agent_id)
+            if self.sent.get(agent_id) == row:
+                # Only fields this consumer did not ask for changed
+                self.upserts.pop(agent_id, None)
+                return
+            self.upserts[agent_id] = row
+        else:
+            self.upserts.pop(agent_id, None)
+            if agent_id not in self.sent:
+                return
+            self.removed.add(agent_id)
+        self.ready.set()
+
+    def take(self) -> Optional[Dict]:
+        self.ready.clear()
+        if not self.upserts and not self.removed:
+            return None
+        delta = {'type': 'delta', 'upserts': list(self.upserts.values()), 'removed': list(self.removed)}
+        self.sent.update(self.upserts)
+        for agent_id in self.removed:
+            self.sent.pop(agent_id, None)
+        self.upserts = {}
+        self.removed = set()
+        return delta
+
+
+class AgentStream:
+    """Fans applied agent updates out to any number of local subscribers as NDJSON."""
+
+    def __init__(self, keepalive: float = 15):
+        self.keepalive = keepalive
+        self.subscribers = set()
+
+    def publish(self, records: Iterable) -> None:
+        if not self.subscribers:
+            return
+        records = list(records)
+        for subscriber in self.subscribers:
+            for record in records:
+                subscriber.offer(record)
+
+    async def lines(self, subscriber: StreamSubscriber, agents: Dict) -> AsyncIterator[str]:
+        # Subscribing and taking the snapshot happen without yielding, so no update falls between them
+        self.subscribers.add(subscriber)
+        try:
+            yield json.dumps(subscriber.snapshot(agents.values())) + '\n'
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield json.dumps({'type': 'keepalive'}) + '\n'
+                    continue
+                delta = subscriber.take()
+                if delta is not None:
+                    yield json.dumps(delta) + '\n'
+        finally:
+            self.subscribers.discard(subscriber)
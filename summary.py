@@ -0,0 +1,77 @@
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+TIMESPAN = re.compile(r'^(?:(\d+)\.)?(\d+):(\d{2}):(\d{2})(?:\.\d+)?$')
+
+
+def to_number(value) -> float:
+    # Ignite sends counters as numbers and durations either as seconds or as a .NET TimeSpan ("d.hh:mm:ss")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = TIMESPAN.match(value)
+        if match:
+            days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+            return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return 0
+
+
+def format_duration(seconds: float) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+class TeamSummary:
+    """Agent counts per state and reason plus sums of the *Today fields, kept current one agent at a time.
+
+    Each agent's last counted record is remembered, so an update subtracts that contribution and adds the new
+    one instead of re-summing every agent.
+    """
+
+    def __init__(self, total_fields: Iterable[str]):
+        self.total_fields = tuple(total_fields)
+        self.predicate: Optional[Callable] = None
+        self.by_state: Counter = Counter()
+        self.by_reason: Counter = Counter()
+        self.totals: Dict[str, float] = dict.fromkeys(self.total_fields, 0)
+        self.counted: Dict = {}  # agent id -> record whose values are in the sums
+        self.version = 0
+
+    def _add(self, record, sign: int) -> None:
+        self.by_state[record.get('currentState') or '--'] += sign
+        reason = record.get('reason')
+        if reason:
+            self.by_reason[reason] += sign
+        for field in self.total_fields:
+            self.totals[field] += sign * to_number(record.get(field))
+
+    def update(self, record) -> None:
+        agent_id = record['id']
+        previous = self.counted.pop(agent_id, None)
+        if previous is not None:
+            self._add(previous, -1)
+        if self.predicate is None or self.predicate(record):
+            self._add(record, 1)
+            self.counted[agent_id] = record
+        self.version += 1
+
+    def rebuild(self, agents: Dict, predicate: Optional[Callable] = None) -> None:
+        self.predicate = predicate
+        self.by_state.clear()
+        self.by_reason.clear()
+        self.totals = dict.fromkeys(self.total_fields, 0)
+        self.counted = {}
+        for record in agents.values():
+            self.update(record)
+
+    def states(self) -> Dict[str, int]:
+        return {state: count for state, count in sorted(self.by_state.items()) if count > 0}
+
+    def reasons(self) -> Dict[str, int]:
+        return {reason: count for reason, count in sorted(self.by_reason.items()) if count > 0}
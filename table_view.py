@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional
+
+
+def sortable(value):
+    # Numbers before text before blanks, so mixed columns never compare int with str
+    if value is None or value == '':
+        return (2, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value).lower())
+
+
+class SortedView:
+    """Filtered agent ids kept in sort order, so a page can be sliced out without sorting every render."""
+
+    def __init__(self, sort_field: str = 'name', descending: bool = False):
+        self.sort_field = sort_field
+        self.descending = descending
+        self.predicate: Optional[Callable[[Dict], bool]] = None
+        self.entries: List = []  # sorted (sort key, id)
+        self.sort_keys: Dict = {}  # id -> sort key currently in entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def sort_key(self, agent: Dict):
+        value = agent.get(self.sort_field)
+        # time_in_status holds the epoch the state was entered, so a later epoch means less time in status
+        if self.sort_field == 'time_in_status' and isinstance(value, (int, float)):
+            value = -value
+        return sortable(value)
+
+    def rebuild(self, agents: Dict, sort_field: Optional[str] = None, descending: Optional[bool] = None,
+                predicate: Optional[Callable[[Dict], bool]] = ...) -> None:
+        if sort_field is not None:
+            self.sort_field = sort_field
+        if descending is not None:
+            self.descending = descending
+        if predicate is not ...:
+            self.predicate = predicate
+        self.sort_keys = {
+            agent_id: self.sort_key(agent)
+            for agent_id, agent in agents.items()
+            if self.predicate is None or self.predicate(agent)
+        }
+        self.entries = sorted((key, agent_id) for agent_id, key in self.sort_keys.items())
+
+    def update(self, agent: Dict) -> None:
+        agent_id = agent['id']
+        key = self.sort_key(agent) if self.predicate is None or self.predicate(agent) else None
+        old_key = self.sort_keys.get(agent_id)
+        if key == old_key:
+            return
+        if old_key is not None:
+            self.remove(agent_id)
+        if key is not None:
+            self.sort_keys[agent_id] = key
+            insort(self.entries, (key, agent_id))
+
+    def remove(self, agent_id) -> None:
+        key = self.sort_keys.pop(agent_id, None)
+        if key is None:
+            return
+        index = bisect_left(self.entries, (key, agent_id))
+        if index < len(self.entries) and self.entries[index] == (key, agent_id):
+            del self.entries[index]
+
+    def window(self, start: int, count: int) -> List[str]:
+        if self.descending:
+            end = len(self.entries) - start
+            entries = self.entries[max(0, end - count):max(0, end)][::-1]
+        else:
+            entries = self.entries[start:start + count]
+        return [agent_id for _, agent_id in entries]
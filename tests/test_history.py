@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from history import StateHistory, split_at_midnight
+
+HOUR_MS = 3600 * 1000
+
+
+def local_midnight_ms(days_ago=0):
+    midnight = datetime.combine(datetime.now().date() - timedelta(days=days_ago), datetime.min.time())
+    return int(midnight.timestamp() * 1000)
+
+
+def agent(state, entered_at):
+    return {'id': 7, 'name': 'Agent 7', 'currentState': state, 'reason': '', 'time_in_status': entered_at}
+
+
+def test_split_at_midnight():
+    midnight = local_midnight_ms()
+    yesterday = datetime.fromtimestamp((midnight - 1) / 1000).strftime('%Y-%m-%d')
+    today = datetime.fromtimestamp(midnight / 1000).strftime('%Y-%m-%d')
+    assert list(split_at_midnight(midnight - HOUR_MS, midnight + 2 * HOUR_MS)) == [
+        (yesterday, HOUR_MS), (today, 2 * HOUR_MS)]
+    assert list(split_at_midnight(midnight, midnight)) == []
+
+
+def test_state_running_past_midnight_is_split_between_days():
+    async def run():
+        history = StateHistory(':memory:')
+        midnight = local_midnight_ms()
+        history.record([agent('ACD', midnight - HOUR_MS)])
+        history.record([agent('Available', midnight + 2 * HOUR_MS)])
+        yesterday = datetime.fromtimestamp((midnight - 1) / 1000).strftime('%Y-%m-%d')
+        totals = await history.day_totals(), await history.day_totals(yesterday)
+        history.close()
+        return totals
+
+    today, yesterday = asyncio.run(run())
+    assert today['states'] == {'ACD': {'transitions': 0, 'duration_ms': 2 * HOUR_MS}}
+    assert yesterday['states'] == {'ACD': {'transitions': 1, 'duration_ms': HOUR_MS}}
+
+
+def test_day_rollover_drops_earlier_days_from_memory():
+    history = StateHistory(':memory:')
+    history.today = '2000-01-01'
+    history.agent_totals[('2000-01-01', '7', 'ACD', '')] = [1, HOUR_MS]
+    history.state_totals[('2000-01-01', 'ACD')] = [1, HOUR_MS]
+    history.record([agent('ACD', local_midnight_ms())])
+    history.close()
+    assert history.today == datetime.now().strftime('%Y-%m-%d')
+    assert not history.agent_totals and not history.state_totals
@@ -0,0 +1,36 @@
+import asyncio
+import json
+
+from ingest import FrameDecoder
+
+
+def agent_frame(agent_id, padding=0):
+    return json.dumps({'C': 'd-1', 'M': [{'H': 'realtimehub', 'M': 'onAgentStateChanged', 'A': [
+        {'id': agent_id, 'firstName': 'Agent', 'lastName': str(agent_id), 'notes': 'x' * padding}]}]})
+
+
+def test_frames_after_a_failing_consumer_keep_their_order():
+    async def run():
+        delivered, errors = [], []
+
+        def on_decoded(agents, source, seconds):
+            agent_id = agents[0]['id']
+            if agent_id == 2:
+                raise RuntimeError('consumer failed')
+            delivered.append(agent_id)
+
+        decoder = FrameDecoder(on_decoded, lambda error, source: errors.append(error), large_frame_bytes=1024)
+        # The first frame is large, so the rest queue behind it and are drained by the same task
+        decoder.submit(agent_frame(1, padding=2048), 'ws')
+        for agent_id in (2, 3, 4):
+            decoder.submit(agent_frame(agent_id), 'ws')
+        while decoder.draining:
+            await asyncio.sleep(0.01)
+        decoder.submit(agent_frame(5), 'ws')
+        decoder.close()
+        return delivered, errors, decoder
+
+    delivered, errors, decoder = asyncio.run(run())
+    assert delivered == [1, 3, 4, 5]
+    assert [str(error) for error in errors] == ['consumer failed']
+    assert not decoder.backlog
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from ingest import FrameRecorder, decode_agent_updates, read_capture
+from replay_server import ReplayServer
+from signalr_client import SessionExpired, SignalRClient, is_hub_call
+
+COOKIE = ('.ASPXAUTH', 'secret')
+SUBSCRIBE = json.dumps({'H': 'realtimehub', 'M': 'subscribe', 'A': ['agents'], 'I': 0})
+
+
+def agent_frame(agent_id, state):
+    return json.dumps({'C': 'd-1', 'M': [{'H': 'realtimehub', 'M': 'onAgentStateChanged', 'A': [
+        {'id': agent_id, 'firstName': 'Agent', 'lastName': str(agent_id), 'currentState': state}]}]})
+
+
+@pytest.fixture
+def capture(tmp_path):
+    path = tmp_path / 'capture.jsonl'
+    recorder = FrameRecorder(str(path))
+    recorder.record('{}', 'ws')  # keep-alive
+    recorder.record(agent_frame(1, 'Available'), 'ws')
+    recorder.record(agent_frame(2, 'Break'), 'ws')
+    recorder.record(agent_frame(1, 'Busy'), 'ws')
+    recorder.close()
+    return list(read_capture(str(path)))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    path = tmp_path / 'storage.json'
+    path.write_text(json.dumps({'cookies': [{'name': COOKIE[0], 'value': COOKIE[1], 'domain': '127.0.0.1'}]}))
+    return str(path)
+
+
+async def stream(server, storage, hub_calls=(), expected=4, timeout=5):
+    url = await server.start_serving()
+    frames = []
+    received = asyncio.Event()
+
+    def on_frame(payload):
+        frames.append(payload)
+        if len(frames) >= expected:
+            received.set()
+
+    client = SignalRClient(url, on_frame=on_frame, storage_path=storage, hub_calls=hub_calls)
+    task = asyncio.create_task(client.run())
+    waiter = asyncio.create_task(received.wait())
+    try:
+        done, _ = await asyncio.wait([task, waiter], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            task.result()  # raises what ended the client
+        if not done:
+            raise asyncio.TimeoutError
+    finally:
+        for pending in (task, waiter):
+            pending.cancel()
+        await asyncio.gather(task, waiter, return_exceptions=True)
+        await server.stop()
+    return frames
+
+
+def test_replayed_capture_reaches_on_frame_in_order(capture, storage):
+    server = ReplayServer(capture, speed=100, cookie=COOKIE)
+    frames = asyncio.run(stream(server, storage))
+
+    assert frames == [payload for _, payload in capture]
+    states = [agent['currentState'] for payload in frames for agent in decode_agent_updates(payload)]
+    assert states == ['Available', 'Break', 'Busy']
+
+
+def test_start_waits_for_init_message(capture, storage):
+    server = ReplayServer(capture, speed=100, cookie=COOKIE, init_delay=0.3)
+    asyncio.run(stream(server, storage))
+
+    assert server.events[:4] == ['negotiate', 'connect', 'init', 'start']
+
+
+def test_captured_hub_calls_are_replayed(capture, storage):
+    server = ReplayServer(capture, speed=100, cookie=COOKIE, wait_for_calls=1)
+    frames = asyncio.run(stream(server, storage, hub_calls=[SUBSCRIBE]))
+
+    assert server.hub_calls == [SUBSCRIBE]
+    assert len(frames) == len(capture)
+
+
+def test_no_frames_without_the_subscription(capture, storage):
+    server = ReplayServer(capture, speed=100, cookie=COOKIE, wait_for_calls=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(stream(server, storage, timeout=0.5))
+
+
+def test_missing_session_raises_session_expired(capture, tmp_path):
+    storage = tmp_path / 'storage.json'
+    storage.write_text(json.dumps({'cookies': []}))
+    server = ReplayServer(capture, cookie=COOKIE)
+    with pytest.raises(SessionExpired):
+        asyncio.run(stream(server, str(storage)))
+
+
+def test_is_hub_call():
+    assert is_hub_call(SUBSCRIBE)
+    assert not is_hub_call(agent_frame(1, 'Available'))
+    assert not is_hub_call('{}')
+    assert not is_hub_call('not json')
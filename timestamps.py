@@ -0,0 +1,42 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+
+class TimestampCache:
+    """Parses Ignite ISO timestamps once, keyed by the raw string, with least-recently-used eviction."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, raw_value) -> Tuple[Optional[int], str]:
+        try:
+            entry = self.entries[raw_value]
+        except (KeyError, TypeError):
+            pass
+        else:
+            self.hits += 1
+            self.entries.move_to_end(raw_value)
+            return entry
+
+        self.misses += 1
+        try:
+            dt = datetime.fromisoformat(raw_value)
+            entry = (int(dt.astimezone(timezone.utc).timestamp() * 1000), dt.strftime('%d/%m/%Y %H:%M:%S'))
+        except Exception:
+            entry = (None, '--')
+
+        if isinstance(raw_value, str):
+            self.entries[raw_value] = entry
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return entry
+
+    def epoch_ms(self, raw_value) -> Optional[int]:
+        return self.lookup(raw_value)[0]
+
+    def display(self, raw_value) -> str:
+        return self.lookup(raw_value)[1]